@@ -0,0 +1,191 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True, initializedcheck=False
+"""
+Cython versions of the kernels in `multiloan._kernels`, used in place of the plain Python kernels when Numba is not
+installed. Payments are rounded to cents as in the other kernels (see `multiloan._kernels._round_cents`).
+"""
+
+import numpy as np
+from libc.math cimport rint, log, log1p, ceil, pow
+from libc.stdint cimport int64_t
+
+from multiloan._kernels import OK, INSUFFICIENT_PAYMENT, STOP_REACHED, MIN_CAPACITY, MAX_CAPACITY
+
+cdef int _OK = OK
+cdef int _INSUFFICIENT_PAYMENT = INSUFFICIENT_PAYMENT
+cdef int _STOP_REACHED = STOP_REACHED
+cdef Py_ssize_t _MIN_CAPACITY = MIN_CAPACITY
+cdef Py_ssize_t _MAX_CAPACITY = MAX_CAPACITY
+
+
+cdef inline double _round_cents(double x) noexcept nogil:
+    """See `multiloan._kernels._round_cents`"""
+    return rint(x * 100.) / 100.
+
+
+cdef (double, double, double) _period(const double[:] balances, const double[::1] growth,
+                                      const double[::1] payments_min, double total_payment,
+                                      const int64_t[::1] rate_order, double[:] new_balances,
+                                      double[:] payments) noexcept nogil:
+    """See `multiloan._kernels._multiloan_period`"""
+    cdef Py_ssize_t i, j, idx
+    cdef Py_ssize_t n_loans = balances.shape[0]
+    cdef double min_total = 0., balance_total = 0., payment_total = 0.
+    cdef double remaining, curr_min, grown, residual_payment, curr_pay
+
+    # Minimum payment for each loan. If balance is less than payment, balance will be paid. Balances after accruing
+    # interest are computed once and replaced by the new balances below.
+    for i in range(n_loans):
+        payments[i] = min(payments_min[i], balances[i])
+        min_total += payments[i]
+        new_balances[i] = balances[i] * growth[i]
+
+    # With remaining amount, contribute to each loan in order of rate
+    remaining = total_payment - min_total
+    for j in range(rate_order.shape[0]):
+        if remaining <= 0:
+            break
+        idx = rate_order[j]
+        curr_min = payments[idx]
+        residual_payment = _round_cents(min(new_balances[idx], remaining + curr_min))
+        payments[idx] = residual_payment
+        remaining -= residual_payment - curr_min
+
+    # Make loan contributions
+    for i in range(n_loans):
+        grown = new_balances[i]
+        curr_pay = min(grown, payments[i])
+        new_balances[i] = _round_cents(grown - curr_pay)
+        payments[i] = _round_cents(curr_pay)
+        balance_total += new_balances[i]
+        payment_total += payments[i]
+
+    return min_total, balance_total, payment_total
+
+
+def _multiloan_period(const double[:] balances, const double[::1] growth, const double[::1] payments_min,
+                      double total_payment, const int64_t[::1] rate_order, double[:] new_balances, double[:] payments):
+    """See `multiloan._kernels._multiloan_period`"""
+    return _period(balances, growth, payments_min, total_payment, rate_order, new_balances, payments)
+
+
+cdef Py_ssize_t _payoff_bound(const double[::1] balances, const double[::1] growth,
+                              const double[::1] payments_min) noexcept nogil:
+    """See `multiloan._kernels._payoff_bound`"""
+    cdef Py_ssize_t i, k
+    cdef Py_ssize_t bound = 0
+    cdef double interest
+    for i in range(balances.shape[0]):
+        if balances[i] <= 0:
+            continue
+        interest = balances[i] * (growth[i] - 1)
+        if payments_min[i] <= interest:
+            return 0
+        if growth[i] == 1:
+            k = <Py_ssize_t> ceil(balances[i] / payments_min[i])
+        else:
+            k = <Py_ssize_t> ceil(log(payments_min[i] / (payments_min[i] - interest)) / log(growth[i]))
+        bound = max(bound, k)
+    return bound
+
+
+def _multiloan_pay_remaining(const double[::1] balances, const double[::1] growth, const double[::1] payments_min,
+                             const double[::1] stops, double total_payment, const int64_t[::1] rate_order):
+    """See `multiloan._kernels._multiloan_pay_remaining`"""
+    cdef Py_ssize_t i, k = 0
+    cdef Py_ssize_t n_loans = balances.shape[0]
+    cdef Py_ssize_t capacity = min(max(_payoff_bound(balances, growth, payments_min) + 2, _MIN_CAPACITY),
+                                   _MAX_CAPACITY)
+    cdef int status = _OK
+    cdef double value = 0., min_total, total_balance = 0., total_payment_k
+
+    loan_balances_arr = np.empty((capacity, n_loans))
+    loan_payments_arr = np.empty((capacity, n_loans))
+    total_balances_arr = np.empty(capacity)
+    total_payments_arr = np.empty(capacity)
+    cdef double[:, ::1] loan_balances = loan_balances_arr
+    cdef double[:, ::1] loan_payments = loan_payments_arr
+    cdef double[::1] total_balances = total_balances_arr
+    cdef double[::1] total_payments = total_payments_arr
+    cdef const double[:] curr_balances = balances
+
+    for i in range(n_loans):
+        total_balance += balances[i]
+
+    while total_balance > 0:
+        # Grow buffers
+        if k == capacity:
+            capacity *= 2
+            loan_balances_arr = np.concatenate([loan_balances_arr, np.empty_like(loan_balances_arr)])
+            loan_payments_arr = np.concatenate([loan_payments_arr, np.empty_like(loan_payments_arr)])
+            total_balances_arr = np.concatenate([total_balances_arr, np.empty_like(total_balances_arr)])
+            total_payments_arr = np.concatenate([total_payments_arr, np.empty_like(total_payments_arr)])
+            loan_balances = loan_balances_arr
+            loan_payments = loan_payments_arr
+            total_balances = total_balances_arr
+            total_payments = total_payments_arr
+            if k > 0:
+                curr_balances = loan_balances[k - 1]
+
+        with nogil:
+            min_total, total_balance, total_payment_k = _period(curr_balances, growth, payments_min, total_payment,
+                                                                rate_order, loan_balances[k], loan_payments[k])
+            if total_payment - min_total < 0:
+                status = _INSUFFICIENT_PAYMENT
+                value = min_total
+            else:
+                for i in range(n_loans):
+                    if loan_balances[k, i] > stops[i]:
+                        status = _STOP_REACHED
+                        value = stops[i]
+        if status != _OK:
+            break
+        total_balances[k] = total_balance
+        total_payments[k] = total_payment_k
+
+        curr_balances = loan_balances[k]
+        k += 1
+
+    return (loan_balances_arr[:k], loan_payments_arr[:k], total_balances_arr[:k], total_payments_arr[:k], status,
+            value)
+
+
+cdef inline double _balance_after(double k, double payment, double principal, double growth) noexcept nogil:
+    """See `multiloan._kernels._balance_after`"""
+    cdef double gk
+    if growth == 1:
+        return principal - payment * k
+    gk = pow(growth, k)
+    return gk * principal - payment * (gk - 1) / (growth - 1)
+
+
+cdef Py_ssize_t _count(double payment, double principal, double growth) noexcept nogil:
+    """See `multiloan._kernels._payoff_count`"""
+    cdef Py_ssize_t k
+    if growth == 1:
+        k = <Py_ssize_t> ceil(principal / payment)
+    else:
+        k = <Py_ssize_t> ceil(-log1p(-principal * (growth - 1) / payment) / log1p(growth - 1))
+
+    # Correct for floating point error so that the balance, rounded to cents, is first cleared at payment `k`
+    if _round_cents(_balance_after(k - 1, payment, principal, growth)) <= 0:
+        k -= 1
+    if _round_cents(_balance_after(k, payment, principal, growth)) > 0:
+        k += 1
+    return k
+
+
+def _payoff_count(double payment, double principal, double growth):
+    """See `multiloan._kernels._payoff_count`"""
+    return _count(payment, principal, growth)
+
+
+def _loan_balances(double payment, double principal, double growth):
+    """See `multiloan._kernels._loan_balances`"""
+    cdef Py_ssize_t i
+    cdef Py_ssize_t k = _count(payment, principal, growth)
+    balances_arr = np.empty(k)
+    cdef double[::1] balances = balances_arr
+    with nogil:
+        for i in range(k):
+            balances[i] = _balance_after(i + 1., payment, principal, growth)
+    return balances_arr
@@ -0,0 +1,264 @@
+"""
+Compiled kernels for paying off multiple loans
+
+Loans are represented as parallel arrays (one element per loan) so that each payment period can be computed in a
+tight loop. These functions are compiled with Numba when it is installed, and payoffs for a range of payments run in
+parallel threads. Otherwise, the Cython versions in `multiloan._cykernels` are used if they were built, or else
+they run as plain Python.
+"""
+
+import math
+import numpy as np
+
+try:
+    from numba import njit, prange, get_num_threads, set_num_threads, config
+    from numba.typed import List
+    NUMBA = True
+except ImportError:
+    NUMBA = False
+    prange = range
+    List = list
+
+    def njit(*args, **kwargs):
+        """Stand-in for `numba.njit` that returns the function uncompiled"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+# Status codes returned by `_multiloan_pay_remaining`
+OK = 0
+INSUFFICIENT_PAYMENT = 1
+STOP_REACHED = 2
+
+# Limits on the number of payments history is initially sized for
+MIN_CAPACITY = 64
+MAX_CAPACITY = 4096
+
+
+@njit(cache=True, nogil=True)
+def _round_cents(x):
+    """
+    Round `x` to cents half to even after scaling, as `np.round(x, 2)` does, whether `x` is a Python or NumPy float
+    The builtin `round` rounds Python floats by their exact value instead (ex. 2.675 -> 2.67, but 2.68 here)
+    """
+    return np.rint(x * 100.) / 100.
+
+
+@njit(cache=True, nogil=True)
+def _multiloan_period(balances, growth, payments_min, total_payment, rate_order, new_balances, payments):
+    """
+    Apply a single payment period to all loans, writing results into `new_balances` and `payments`
+    Each loan's balance is multiplied by its `growth` factor as interest accrues over the period
+    First the minimum payment is made to each loan, then the remainder of `total_payment` is contributed to loans in
+    `rate_order`
+    :return: (min_total, balance_total, payment_total)
+    | min_total: sum of minimum payments
+    | balance_total: sum of balances after the payment
+    | payment_total: sum of payments
+    """
+    n_loans = balances.shape[0]
+
+    # Minimum payment for each loan. If balance is less than payment, balance will be paid
+    np.minimum(payments_min, balances, payments)
+    min_total = 0.
+    for i in range(n_loans):
+        min_total += payments[i]
+
+    # Balance after accruing interest, computed once and replaced by the new balance below
+    np.multiply(balances, growth, new_balances)
+
+    # With remaining amount, contribute to each loan in order of rate
+    remaining = total_payment - min_total
+    for j in range(rate_order.shape[0]):
+        if remaining <= 0:
+            break
+        idx = rate_order[j]
+        curr_min = payments[idx]
+        # Payment can't exceed the balance after accruing interest
+        residual_payment = _round_cents(min(new_balances[idx], remaining + curr_min))
+        payments[idx] = residual_payment
+        remaining -= residual_payment - curr_min
+
+    # Make loan contributions
+    balance_total = 0.
+    payment_total = 0.
+    for i in range(n_loans):
+        grown = new_balances[i]
+        curr_pay = min(grown, payments[i])
+        new_balances[i] = _round_cents(grown - curr_pay)
+        payments[i] = _round_cents(curr_pay)
+        balance_total += new_balances[i]
+        payment_total += payments[i]
+
+    return min_total, balance_total, payment_total
+
+
+@njit(cache=True, nogil=True)
+def _payoff_bound(balances, growth, payments_min):
+    """
+    Upper bound on the number of payments to pay off all loans, from paying only the minimum payment on each loan
+    :return: The bound, or 0 if a minimum payment does not cover the interest on its loan
+    """
+    bound = 0
+    for i in range(balances.shape[0]):
+        if balances[i] <= 0:
+            continue
+        interest = balances[i] * (growth[i] - 1)
+        if payments_min[i] <= interest:
+            return 0
+        if growth[i] == 1:
+            k = math.ceil(balances[i] / payments_min[i])
+        else:
+            k = math.ceil(math.log(payments_min[i] / (payments_min[i] - interest)) / math.log(growth[i]))
+        bound = max(bound, int(k))
+    return bound
+
+
+@njit(cache=True, nogil=True)
+def _multiloan_pay_remaining(balances, growth, payments_min, stops, total_payment, rate_order):
+    """
+    Apply payment periods to all loans until the total balance is paid off
+    :return: (loan_balances, loan_payments, total_balances, total_payments, status, value)
+    | loan_{balances, payments}: arrays of dimensions [n_payments X loans]
+    | total_{balances, payments}: sum over loans for each payment
+    | status: OK, or the reason the loans could not be paid off, in which case the history ends before the failure
+    | value: sum of minimum payments if INSUFFICIENT_PAYMENT or the stopping criteria if STOP_REACHED
+    """
+    n_loans = balances.shape[0]
+    # Size history for the slowest payoff, allowing for rounding of each payment. Grows if this falls short.
+    capacity = min(max(_payoff_bound(balances, growth, payments_min) + 2, MIN_CAPACITY), MAX_CAPACITY)
+    loan_balances = np.empty((capacity, n_loans))
+    loan_payments = np.empty((capacity, n_loans))
+    total_balances = np.empty(capacity)
+    total_payments = np.empty(capacity)
+
+    curr_balances = balances
+    total_balance = 0.
+    for i in range(n_loans):
+        total_balance += balances[i]
+
+    k = 0
+    status = OK
+    value = 0.
+    while total_balance > 0:
+        # Grow buffers
+        if k == capacity:
+            capacity *= 2
+            new_loan_balances = np.empty((capacity, n_loans))
+            new_loan_balances[:k] = loan_balances[:k]
+            loan_balances = new_loan_balances
+            new_loan_payments = np.empty((capacity, n_loans))
+            new_loan_payments[:k] = loan_payments[:k]
+            loan_payments = new_loan_payments
+            new_total_balances = np.empty(capacity)
+            new_total_balances[:k] = total_balances[:k]
+            total_balances = new_total_balances
+            new_total_payments = np.empty(capacity)
+            new_total_payments[:k] = total_payments[:k]
+            total_payments = new_total_payments
+
+        min_total, total_balance, total_payments[k] = _multiloan_period(
+            curr_balances, growth, payments_min, total_payment, rate_order, loan_balances[k], loan_payments[k])
+        if total_payment - min_total < 0:
+            status = INSUFFICIENT_PAYMENT
+            value = min_total
+            break
+
+        for i in range(n_loans):
+            if loan_balances[k, i] > stops[i]:
+                status = STOP_REACHED
+                value = stops[i]
+        if status != OK:
+            break
+        total_balances[k] = total_balance
+
+        curr_balances = loan_balances[k]
+        k += 1
+
+    return loan_balances[:k], loan_payments[:k], total_balances[:k], total_payments[:k], status, value
+
+
+@njit(cache=True, parallel=True)
+def _multiloan_payrange(balances, growth, payments_min, stops, amounts, rate_order):
+    """
+    Pay off all loans with each of `amounts` as the total payment, in parallel across amounts
+    :return: (status, loan_payments, total_payments)
+    | status: status of each payoff (see `_multiloan_pay_remaining`)
+    | loan_payments: list of arrays of dimensions [n_payments X loans] for each amount
+    | total_payments: list of sums over loans for each payment for each amount
+    """
+    n_amounts = amounts.shape[0]
+    status = np.empty(n_amounts, dtype=np.int64)
+    loan_payments = List()
+    total_payments = List()
+    for a in range(n_amounts):
+        loan_payments.append(np.empty((0, balances.shape[0])))
+        total_payments.append(np.empty(0))
+
+    for a in prange(n_amounts):
+        _, loan_payments[a], _, total_payments[a], status[a], _ = _multiloan_pay_remaining(
+            balances, growth, payments_min, stops, amounts[a], rate_order)
+    return status, loan_payments, total_payments
+
+
+def multiloan_payrange(balances, growth, payments_min, stops, amounts, rate_order, n_jobs=-1):
+    """
+    Run `_multiloan_payrange` with `n_jobs` threads (all threads if -1)
+    """
+    if not NUMBA:
+        return _multiloan_payrange(balances, growth, payments_min, stops, amounts, rate_order)
+
+    n_threads = get_num_threads()
+    set_num_threads(config.NUMBA_NUM_THREADS if n_jobs < 0 else min(n_jobs, config.NUMBA_NUM_THREADS))
+    try:
+        return _multiloan_payrange(balances, growth, payments_min, stops, amounts, rate_order)
+    finally:
+        set_num_threads(n_threads)
+
+
+@njit('float64(float64, float64, float64, float64)', cache=True, nogil=True)
+def _balance_after(k, payment, principal, growth):
+    """Balance after `k` payments of `payment` to `principal` with `growth` per period"""
+    if growth == 1:
+        return principal - payment * k
+    gk = growth ** k
+    return gk * principal - payment * (gk - 1) / (growth - 1)
+
+
+@njit('int64(float64, float64, float64)', cache=True, nogil=True)
+def _payoff_count(payment, principal, growth):
+    """Number of payments of `payment` needed to pay off `principal` with `growth` per period"""
+    if growth == 1:
+        k = math.ceil(principal / payment)
+    else:
+        k = math.ceil(-math.log1p(-principal * (growth - 1) / payment) / math.log1p(growth - 1))
+
+    # Correct for floating point error so that the balance, rounded to cents, is first cleared at payment `k`
+    if np.round(_balance_after(k - 1, payment, principal, growth), 2) <= 0:
+        k -= 1
+    if np.round(_balance_after(k, payment, principal, growth), 2) > 0:
+        k += 1
+    return k
+
+
+@njit('float64[::1](float64, float64, float64)', cache=True, nogil=True)
+def _loan_balances(payment, principal, growth):
+    """
+    Balances, before rounding, after each payment of `payment` to `principal` with `growth` per period until it is
+    paid off (see `multiloan.utils.pay_loan`)
+    """
+    k = _payoff_count(payment, principal, growth)
+    balances = np.empty(k)
+    for i in range(k):
+        balances[i] = _balance_after(i + 1., payment, principal, growth)
+    return balances
+
+
+# Whether the Cython kernels are used in place of the plain Python ones
+CYTHON = False
+if not NUMBA:
+    try:
+        from multiloan._cykernels import _multiloan_period, _multiloan_pay_remaining, _payoff_count, _loan_balances
+        CYTHON = True
+    except ImportError:
+        pass
@@ -1,7 +1,12 @@
 """Define loan classes"""
 
-from multiloan.utils import pay_loan, money_amount, single_payment, payment_amount
+from multiloan.utils import _pay_loan_arrays, _payoff_stats_arrays, _lru_cache_nbytes, growth_factor, money_amount
+from multiloan._kernels import _multiloan_period, _multiloan_pay_remaining, multiloan_payrange, OK, \
+    INSUFFICIENT_PAYMENT, STOP_REACHED, MIN_CAPACITY
 from warnings import warn
+from functools import lru_cache
+from operator import attrgetter
+import os
 import pandas as pd
 import numpy as np
 from typing import List, Union
@@ -32,6 +37,11 @@ class Loan:
     pay_remaining(amount): Pay the remaining balance on loan, using `payment` as default or provide a custom `amount`
     pay_one(amount): Make a single payment using `payment` as default or provide a custom `amount`
     reset(): Reset payment history
+    Loan.from_arrays(principals, rates, payments): Make a list of many loans at once
+
+    `pay_remaining` computes the schedule in closed form (see `utils.pay_loan`), which rounds each balance to cents
+    once. `pay_one` and MultiLoan round each balance before accruing interest on it, so their balances can differ
+    from `pay_remaining` by cents.
 
     Properties
     ----------
@@ -39,79 +49,261 @@ class Loan:
     balances: A list of balances after accruing interest and applying payments for each pay period
     totalpay: The total amount paid on this loan (ie. sum(payments))
     n_payments: The number of payments on this loan (ie. len(payments) - 1, to account for initial empty payment)
+    all_positive: Whether all balances before payoff and all payments made are positive
     df: A pandas DataFrame of payments and balances
     """
 
+    # Number of times the features of any loan have been set, so MultiLoans know when to gather them again
+    _changes = 0
+
     def __init__(self, principal: float, rate: float, payment: float = 0, n: int = 365, t: float = 1 / 12, stop=1e6):
 
-        self.principal = principal
-        self.rate = rate
-        self.payment = payment
-        self.n = n
-        self.t = t
-        self.stop = stop
+        self._principal = principal
+        self._rate = rate
+        self._payment = payment
+        self._n = n
+        self._t = t
+        self._stop = stop
+        # Growth of balance over a single pay period, updated whenever `rate`, `n`, or `t` are set
+        self._g = growth_factor(rate, n, t)
 
         # Initialize
         self.reset()
 
+    @classmethod
+    def from_arrays(cls, principals, rates, payments, n: int = 365, t: float = 1 / 12, stop=1e6) -> List['Loan']:
+        """
+        Make many loans at once from arrays of their principals, rates, and payments, sharing `n`, `t`, and `stop`
+        Equivalent to `[Loan(p, r, pay, n, t, stop) for p, r, pay in zip(principals, rates, payments)]`, but growth
+        factors are computed once per distinct rate and history for all loans is allocated in a single block
+        """
+        principals = np.asarray(principals, dtype=np.float64)
+        rates = np.asarray(rates, dtype=np.float64)
+        payments = np.asarray(payments, dtype=np.float64)
+        if not len(principals) == len(rates) == len(payments):
+            raise ValueError('`principals`, `rates`, and `payments` must have the same length')
+        # Subclasses may set up more in `__init__`
+        if cls.__init__ is not Loan.__init__:
+            return [cls(p, r, pay, n, t, stop) for p, r, pay in zip(principals.tolist(), rates.tolist(),
+                                                                    payments.tolist())]
+        n_loans = len(principals)
+
+        unique_rates, rate_idx = np.unique(rates, return_inverse=True)
+        growth = np.array([growth_factor(r, n, t) for r in unique_rates.tolist()], dtype=np.float64)[rate_idx]
+
+        # Rows of a shared block, replaced by a loan's own buffers if it outgrows them (see `_reserve`)
+        history_payments = np.empty((n_loans, MIN_CAPACITY), dtype=np.float64)
+        history_balances = np.empty((n_loans, MIN_CAPACITY), dtype=np.float64)
+
+        loans = []
+        for i, (principal, rate, payment, g) in enumerate(zip(principals.tolist(), rates.tolist(), payments.tolist(),
+                                                               growth.tolist())):
+            loan = cls.__new__(cls)
+            loan.__dict__.update(_principal=principal, _rate=rate, _payment=payment, _n=n, _t=t, _stop=stop, _g=g)
+            loan._init_history(history_payments[i], history_balances[i])
+            loans.append(loan)
+        return loans
+
     def reset(self):
         """
         Reset payment loan payment history
         """
-        self._payments = [0]
-        self._balances = [self.principal]
+        self._init_history(np.empty(MIN_CAPACITY, dtype=np.float64), np.empty(MIN_CAPACITY, dtype=np.float64))
+
+    def _init_history(self, payments: np.ndarray, balances: np.ndarray):
+        """Start an empty payment history in the buffers `payments` and `balances`"""
+        # History is preallocated and filled up to index `n_payments`, growing as needed (see `_reserve`)
+        self._payments = payments
+        self._balances = balances
+        self._payments[0] = 0
+        self._balances[0] = self.principal
+        # Running totals, updated with each payment. Low-order bits lost from the total paid are carried separately.
+        self._totalpay = 0.
+        self._totalpay_c = 0.
+        self._n_payments = 0
+        # (MultiLoan, index) paying this loan, whose history is copied here when read (see `_sync`)
+        self._source = None
+        self._synced = None
+
+    def _sync(self):
+        """Copy this loan's payment history from the MultiLoan paying it, if it has changed since it was last copied"""
+        multiloan, i = self._source
+        if self._synced != multiloan._version:
+            multiloan._fill_history(self, i)
+            self._synced = multiloan._version
+
+    def _detach(self):
+        """Keep the payment history from the MultiLoan paying this loan, and stop following its payments"""
+        self._sync()
+        self._source = None
+
+    def _reserve(self, n):
+        """Make room for `n` more payments in the payment history, doubling capacity as needed"""
+        capacity = len(self._balances)
+        required = self._n_payments + 1 + n
+        if required > capacity:
+            capacity = max(2 * capacity, required)
+            for attr in ['_payments', '_balances']:
+                history = np.empty(capacity, dtype=np.float64)
+                history[:self._n_payments + 1] = getattr(self, attr)[:self._n_payments + 1]
+                setattr(self, attr, history)
+
+    def _add_totalpay(self, amount):
+        """Add `amount` to the total paid with Kahan compensated summation"""
+        y = amount - self._totalpay_c
+        total = self._totalpay + y
+        self._totalpay_c = (total - self._totalpay) - y
+        self._totalpay = total
+
+    @property
+    def principal(self):
+        return self._principal
+
+    @principal.setter
+    def principal(self, principal):
+        self._principal = principal
+        Loan._changes += 1
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @rate.setter
+    def rate(self, rate):
+        self._rate = rate
+        self._g = growth_factor(rate, self._n, self._t)
+        Loan._changes += 1
+
+    @property
+    def payment(self):
+        return self._payment
+
+    @payment.setter
+    def payment(self, payment):
+        self._payment = payment
+        Loan._changes += 1
+
+    @property
+    def n(self):
+        return self._n
+
+    @n.setter
+    def n(self, n):
+        self._n = n
+        self._g = growth_factor(self._rate, n, self._t)
+        Loan._changes += 1
+
+    @property
+    def t(self):
+        return self._t
+
+    @t.setter
+    def t(self, t):
+        self._t = t
+        self._g = growth_factor(self._rate, self._n, t)
+        Loan._changes += 1
+
+    @property
+    def stop(self):
+        return self._stop
+
+    @stop.setter
+    def stop(self, stop):
+        self._stop = stop
+        Loan._changes += 1
 
     @property
     def balance(self):
-        return self._balances[-1]
+        if self._source is not None:
+            self._sync()
+        return float(self._balances[self._n_payments])
 
     @property
     def totalpay(self):
-        return sum(self._payments)
+        if self._source is not None:
+            self._sync()
+        return self._totalpay
 
     @property
     def n_payments(self):
-        return len(self._payments) - 1
+        if self._source is not None:
+            self._sync()
+        return self._n_payments
 
     @property
     def payments(self):
-        return np.array(self._payments)
+        if self._source is not None:
+            self._sync()
+        return self._payments[:self._n_payments + 1]
 
     @property
     def balances(self):
-        return np.array(self._balances)
+        if self._source is not None:
+            self._sync()
+        return self._balances[:self._n_payments + 1]
+
+    @property
+    def all_positive(self):
+        """Whether all balances before the loan is paid off and all payments made are positive"""
+        return bool((self.balances[:-1] > 0).all() and (self.payments[1:] > 0).all())
 
     @property
     def df(self):
         """DataFrame of payment history"""
-        data = [{'amount': p, 'balance': b, 'payment': i} for p, b, i in zip(self._payments, self._balances, range(len(self._payments)))]
-        return pd.DataFrame(data)
+        return pd.DataFrame({'amount': self.payments, 'balance': self.balances,
+                             'payment': np.arange(self.n_payments + 1, dtype=np.int64)})
 
 
     def pay_remaining(self, amount=None):
         """
-        Payment schedule for paying off remaining balance
+        Payment schedule for paying off remaining balance, computed in closed form (see `utils.pay_loan` for how it can
+        differ from repeating `pay_one` by cents)
         amount: `loan.payment` if none provided, else `amount` if provided
         """
+        if self._source is not None:
+            self._detach()
         if not amount:
             amount = self.payment
-        balances, payments = pay_loan(amount, self.balance, self.rate, self.n, self.t, self.stop)
-        self._balances += balances
-        self._payments += payments
+        balance = self.balance
+        # Nothing left to pay
+        if balance <= 0:
+            return
+        balances, payments = _pay_loan_arrays(amount, balance, self._g, self.stop)
+        k = len(payments)
+        self._reserve(k)
+        t = self._n_payments
+        self._balances[t + 1:t + 1 + k] = balances
+        self._payments[t + 1:t + 1 + k] = payments
+        # All but the final payment are the same
+        self._add_totalpay(float(payments[0] * (k - 1) + payments[-1]))
+        self._n_payments += k
 
     def pay_one(self, amount=None):
         """
         Make a single payment to this loan after accruing interest for the payment period
         Default payment is set loan `payment`
         """
+        if self._source is not None:
+            self._detach()
         if not amount:
             amount = self.payment
-        # Apply single payment
-        new_amount, curr_pay = single_payment(amount, self.balance, self.rate, self.n, self.t)
+        self._apply_payment(self.balance * self._g, amount)
+
+    def _apply_payment(self, grown, amount):
+        """
+        Pay `amount` toward `grown`, the balance after accruing interest for the payment period
+        """
+        # Payment can't exceed the balance
+        curr_pay = amount if amount < grown else grown
+        new_amount = round(grown - curr_pay, 2)
+        curr_pay = round(curr_pay, 2)
 
         # Save
-        self._payments.append(curr_pay)
-        self._balances.append(new_amount)
+        self._reserve(1)
+        self._payments[self._n_payments + 1] = curr_pay
+        self._balances[self._n_payments + 1] = new_amount
+        self._add_totalpay(curr_pay)
+        self._n_payments += 1
 
     def __repr__(self):
         rep = f'Loan(original={money_amount(self.principal)}, balance={money_amount(self.balance)}, rate={self.rate})'
@@ -138,6 +330,13 @@ class MultiLoan:
 
     Only a list of loans or a filepath can be provided
 
+    Changes to the features of its Loans (ex. `rate` or `payment`) apply from the next payment, and changes to their
+    `principal` from the next reset.
+
+    Payment history is recorded by the MultiLoan for all loans at once (see `loan_{balances, payments}`). Each of the
+    `Loan` objects follows its own history, which is copied from the MultiLoan when it is read. A Loan follows the
+    MultiLoan it was most recently given to, until it is paid or reset directly.
+
     Parameters
     ----------
     Loans: an array of Loan objects
@@ -148,12 +347,14 @@ class MultiLoan:
         *Rates must be provided as DECIMALS, not percents (ex. 5% must be provided as .05)
     {principal, rate, payment}_col: Name of column in file at `filepath` indicating each loan feature
     load_kwargs: A dict of keyword arguments to pass to `pd.read_csv()`, which is used to read in `filepath`
+        A file on disk without `load_kwargs` is only read again once it has been modified
 
     Functions
     -------
     pay_remaining(amount): Pay the remaining balance on loan, using `payment` as default or provide a custom `amount`
     pay_one(amount): Make a single payment using `payment` as default or provide a custom `amount`
     reset(): Reset payment history
+    loan_history(i): A copy of the `i`th Loan with its payment history from this MultiLoan
 
     Properties
     ----------
@@ -161,6 +362,7 @@ class MultiLoan:
     balances: A list of balances after accruing interest and applying payments for each pay period
     totalpay: The total amount paid on this loan (ie. sum(payments))
     n_payments: The number of payments on this loan (ie. len(payments) - 1, to account for initial empty payment)
+    all_positive: Whether all balances before payoff and all payments made are positive
     loan_{balances, payments, totals}: A nested list of dimensions [loans X n_payments] containing that loan's {balance,
         payment, total payment} history
     df: A pandas DataFrame of the payment and balance history for each loan, including the "total" payments and
@@ -192,167 +394,237 @@ class MultiLoan:
         self.Loans = Loans
         self.payment = payment
         self.n_loans = len(Loans)
+        self._gather_features()
+
+        # Incremented with each change to payment history, so loans know when to copy it again (see `Loan._sync`)
+        self._version = 0
         self.reset()
 
-        # Order loans by rate from highest to lowest
-        rates = [loan.rate for loan in Loans]
-        self._rate_order = np.argsort(rates)[::-1]
+    def _gather_features(self):
+        """Gather the features of each loan"""
+        # Loan features as contiguous arrays (one element per loan) for compiled kernels
+        self._principal_arr, self._rate_arr, self._growth_arr, self._min_arr, self._stop_arr = (
+            np.fromiter(map(attrgetter(feature), self.Loans), dtype=np.float64, count=self.n_loans)
+            for feature in ['principal', 'rate', '_g', 'payment', 'stop'])
+
+        # Order loans by rate from highest to lowest, with the last provided first among loans with equal rates
+        self._rate_order = np.ascontiguousarray(np.argsort(self._rate_arr, kind='stable')[::-1], dtype=np.int64)
+
+        # Features that determine payment history, used to memoize payoffs
+        self._signature = tuple((loan.principal, loan.rate, loan.payment, loan.n, loan.t, loan.stop)
+                                for loan in self.Loans)
+        self._gathered = Loan._changes
+
+    def _update_features(self):
+        """Gather the features of each loan again if any loan has been changed since they were last gathered"""
+        if self._gathered != Loan._changes:
+            self._gather_features()
 
     def _load_file(self):
         """Load loan data from pd.read_csv() readable file"""
-        # Load file
-        loan_data = pd.read_csv(self.filepath, **self.load_kwargs)
+        columns = (self.principal_col, self.rate_col, self.payment_col)
+        # Files on disk are only read again if they have been modified since they were last loaded. Other paths (ex.
+        # URLs) are always read.
+        if isinstance(self.filepath, (str, os.PathLike)) and not self.load_kwargs and os.path.isfile(self.filepath):
+            stat = os.stat(self.filepath)
+            loan_data = _load_columns_cached(os.path.abspath(self.filepath), stat.st_mtime_ns, stat.st_size, columns)
+        else:
+            loan_data = _load_columns(self.filepath, columns, self.load_kwargs)
         #
         # # Convert all to floats by removing strings
         # columns = [self.principal_col, self.rate_col, self.payment_col]
         #
         # loan_data = loan_data[columns].astype(str).applymap(lambda x: ''.join(re.findall('\d|/.', x))).astype(float)
 
-        # Extract data
-        principals = loan_data[self.principal_col]
-        rates = loan_data[self.rate_col]
-        payments = loan_data[self.payment_col]
+        # Extract data as float arrays
+        principals, rates, payments = loan_data.T
 
         # Make loan objects
-        loans = [Loan(p, r, pay) for p, r, pay in zip(principals, rates, payments)]
+        loans = Loan.from_arrays(principals, rates, payments)
         return loans
 
+    def _recur_amount(self, amount=None):
+        """Recurring payment amount, `amount` if provided, else `MultiLoan.payment`"""
+        if amount:
+            return amount
+        return self.payment
+
     def pay_one(self, amount=None):
         """
         Apply a single payment period to all loans using Multiloan.payment as default amount
         amount: provide a recurring payment amount to override default
         """
-        curr_payments = {i: 0 for i in range(len(self.Loans))}
-
-        # First gather cost of a single payment
-        for i, loan in enumerate(self.Loans):
-            # Do a single payment to get payment amount
-            # If balance is less than payment, balance will be returned
-            min_pay = payment_amount(loan.payment, loan.balance)
-            curr_payments[i] += min_pay
-
-        # Balance after paying off minimum payments
-        curr_min_payments = sum(curr_payments.values())
-
-        # Now apply remainder of recurring amount
-        if amount:
-            recur_amount = amount
-        else:
-            recur_amount = self.payment
-        curr_remaining = recur_amount - curr_min_payments
-        assert curr_remaining >= 0, f'Multiloan payment ({money_amount(recur_amount)}) must exceed the sum of recurring payments for each Loan ({money_amount(curr_min_payments)})'
-
-        # With remaining amount, now contribute to each loan in order of rate
-        for idx in self._rate_order:
-            if curr_remaining > 0:
-                loan = self.Loans[idx]
-                # Recalculate the single payment with the current remaining for each loan + what has already been paid
-                curr_min = curr_payments[idx]
-                _, residual_payment = single_payment(curr_remaining + curr_min, loan.balance, loan.rate, loan.n, loan.t)
-                # Update loan payment
-                curr_payments[idx] = residual_payment
-                # Recalculate curr_remaining
-                curr_remaining -= (residual_payment - curr_min)
-            else:
-                break
-
-        # Now make loan contributions
-        for idx, payment in curr_payments.items():
-            loan = self.Loans[idx]
-            # Make payment
-            loan.pay_one(payment)
+        recur_amount = self._recur_amount(amount)
+        self._update_features()
+
+        # Write the payment directly into the next column of payment history
+        self._reserve(1)
+        t = self._t
+        curr_min_payments, curr_balance, curr_total_payment = _multiloan_period(
+            self._loan_balances[t], self._growth_arr, self._min_arr, float(recur_amount), self._rate_order,
+            self._loan_balances[t + 1], self._loan_payments[t + 1])
+        assert recur_amount - curr_min_payments >= 0, f'Multiloan payment ({money_amount(recur_amount)}) must exceed the sum of recurring payments for each Loan ({money_amount(curr_min_payments)})'
+        self._t += 1
+        self._version += 1
 
         # Now update data
-        curr_total_payment = sum(curr_payments.values())
-        self._payments.append(curr_total_payment)
-        curr_balance = sum([loan.balance for loan in self.Loans])
-        self._balances.append(curr_balance)
+        self._total_payments[t + 1] = curr_total_payment
+        self._total_balances[t + 1] = curr_balance
+        self._totalpay += curr_total_payment
+        self._n_payments += 1
 
     def pay_remaining(self, amount=None):
         """
         Pay off the remaining balance to all loans using Multiloan.payment as default recurring payment amount
         amount: provide a recurring payment amount to override default
         """
-        while self.balance > 0:
-            self.pay_one(amount)
-
+        # Nothing left to pay
+        if self.balance <= 0:
+            return
+
+        recur_amount = self._recur_amount(amount)
+        self._update_features()
+        curr_balances = self._loan_balances[self._t]
+        loan_balances, loan_payments, total_balances, total_payments, status, value = _multiloan_pay_remaining(
+            curr_balances, self._growth_arr, self._min_arr, self._stop_arr, float(recur_amount),
+            self._rate_order)
+
+        # Save payments made before any failure
+        k = len(loan_balances)
+        self._reserve(k)
+        self._loan_balances[self._t + 1:self._t + 1 + k] = loan_balances
+        self._loan_payments[self._t + 1:self._t + 1 + k] = loan_payments
+        self._total_balances[self._t + 1:self._t + 1 + k] = total_balances
+        self._total_payments[self._t + 1:self._t + 1 + k] = total_payments
+        self._t += k
+        self._version += 1
+        self._totalpay = sum(total_payments.tolist(), self._totalpay)
+        self._n_payments += k
+
+        assert status != INSUFFICIENT_PAYMENT, f'Multiloan payment ({money_amount(recur_amount)}) must exceed the sum of recurring payments for each Loan ({money_amount(value)})'
+        assert status != STOP_REACHED, f'Payments of {money_amount(recur_amount)} have led the balance to reach ' \
+                                       f'stopping criteria of {money_amount(value)}.'
+
+    def _reserve(self, n):
+        """Make room for `n` more payments in the payment history, doubling capacity as needed"""
+        capacity = self._loan_balances.shape[0]
+        required = self._t + 1 + n
+        if required > capacity:
+            capacity = max(2 * capacity, required)
+            for attr in ['_loan_balances', '_loan_payments', '_total_balances', '_total_payments']:
+                old = getattr(self, attr)
+                history = np.empty((capacity,) + old.shape[1:], dtype=np.float64)
+                history[:self._t + 1] = old[:self._t + 1]
+                setattr(self, attr, history)
 
     def reset(self):
         """
         Reset payment loan payment history
         """
-        self._payments = [0]
-        self.principal = sum([loan.principal for loan in self.Loans])
-        self._balances = [self.principal]
-        for loan in self.Loans:
-            loan.reset()
+        self._update_features()
+        # Summed in loan order, as are the balances of each payment period
+        self.principal = sum(self._principal_arr.tolist())
+
+        # Running totals, updated with each payment
+        self._totalpay = 0
+        self._n_payments = 0
+
+        # Payment history of each loan with dimensions [capacity X loans], filled up to row `_t`. Each payment period
+        # is a contiguous row for the kernels. Sums over loans for each payment period are kept alongside.
+        self._t = 0
+        self._loan_balances = np.empty((MIN_CAPACITY, self.n_loans), dtype=np.float64)
+        self._loan_payments = np.empty((MIN_CAPACITY, self.n_loans), dtype=np.float64)
+        self._total_balances = np.empty(MIN_CAPACITY, dtype=np.float64)
+        self._total_payments = np.empty(MIN_CAPACITY, dtype=np.float64)
+        self._loan_balances[0] = self._principal_arr
+        self._loan_payments[0] = 0
+        self._total_balances[0] = self.principal
+        self._total_payments[0] = 0
+
+        # Loans follow this payment history
+        self._version += 1
+        for i, loan in enumerate(self.Loans):
+            loan._source = (self, i)
+            loan._synced = None
 
     @property
     def balance(self):
-        return self._balances[-1]
+        return float(self._total_balances[self._t])
 
     @property
     def totalpay(self):
-        return sum(self._payments)
+        return self._totalpay
 
     @property
     def n_payments(self):
-        return len(self._payments) - 1
+        return self._n_payments
+
+    @property
+    def _payments(self):
+        """List of Multiloan payments"""
+        return self.payments.tolist()
+
+    @property
+    def _balances(self):
+        """List of Multiloan balances"""
+        return self.balances.tolist()
 
     @property
     def loan_balances(self):
         """Get list of balances after each payment for each loan"""
-        lbs = []
-        n = len(self.balances)
-        for l in self.Loans:
-            lb = l._balances
-            nzeros = n - len(lb)
-            lb += [0] * nzeros
-            lbs.append(lb)
-
-        return np.array(lbs)
+        return self._loan_balances[:self._t + 1].T
 
     @property
     def loan_payments(self):
         """Get list of payments for each loan"""
-        lps = []
-        n = len(self.balances)
-        for l in self.Loans:
-            lp = l._payments
-            nzeros = n - len(lp)
-            lp += [0] * nzeros
-            lps.append(lp)
-        return np.array(lps)
+        return self._loan_payments[:self._t + 1].T
+
+    def loan_history(self, i: int) -> Loan:
+        """
+        A copy of the `i`th Loan with its payment history from this MultiLoan
+        """
+        loan = Loan(*self._signature[i])
+        self._fill_history(loan, i)
+        return loan
+
+    def _fill_history(self, loan: Loan, i: int):
+        """Write the payment history of the `i`th loan into `loan`"""
+        loan._balances = self._loan_balances[:self._t + 1, i].copy()
+        loan._payments = self._loan_payments[:self._t + 1, i].copy()
+        loan._n_payments = self._t
+        loan._totalpay = sum(loan._payments[1:].tolist())
+        loan._totalpay_c = 0.
 
     @property
     def loan_totals(self):
         """List of totalpayments for each loan"""
-        return np.array([loan.totalpay for loan in self.Loans])
+        return self.loan_payments.sum(1)
 
     @property
     def payments(self):
         """A list of Multiloan payments"""
-        return np.array(self._payments)
+        return self._total_payments[:self._t + 1]
 
     @property
     def balances(self):
         """A list of multiloan balances"""
-        return np.array(self._balances)
+        return self._total_balances[:self._t + 1]
+
+    @property
+    def all_positive(self):
+        """Whether all balances before the loans are paid off and all payments made are positive"""
+        return bool((self.balances[:-1] > 0).all() and (self.payments[1:] > 0).all())
 
     @property
     def df(self):
         """DataFrame of payment history for each loan including 'total'"""
-        # Get data for each loan
-        data = [{'loan': 'loan_%s' % i, 'amount': p, 'balance': b, 'payment': n}
-                for i, loan in enumerate(self.Loans)
-                for p, b, n in zip(loan._payments, loan._balances, range(len(loan._payments)))]
-        # Get data for total
-        total_data = [{'loan': 'total', 'amount': p, 'balance': b, 'payment': n} for p, b, n
-                      in zip(self._payments, self._balances, range(len(self._payments)))]
-        # Combine into one list
-        data += total_data
-        # DataFrame
-        df = pd.DataFrame(data)
+        # Rows for each loan followed by rows for total
+        n_payments = self._t + 1
+        loans = ['loan_%s' % i for i in range(self.n_loans)] + ['total']
+        df = pd.DataFrame({'loan': np.repeat(loans, n_payments),
+                           'amount': np.concatenate([self.loan_payments.ravel(), self.payments]),
+                           'balance': np.concatenate([self.loan_balances.ravel(), self.balances]),
+                           'payment': np.tile(np.arange(n_payments, dtype=np.int64), len(loans))})
         return df
 
 
@@ -373,6 +645,81 @@ Number of payments: {self.n_payments}"""
         return rep
 
 
+def _load_columns(filepath, columns: tuple, load_kwargs: dict) -> np.ndarray:
+    """
+    Load `columns` from pd.read_csv() readable `filepath` as a float array of dimensions [loans X columns]
+    Only the loan columns are read as floats, unless overridden by `load_kwargs`
+    """
+    load_kwargs = {'usecols': list(columns), 'dtype': dict.fromkeys(columns, np.float64), 'engine': 'c',
+                   **load_kwargs}
+    loan_data = pd.read_csv(filepath, **load_kwargs)
+    return loan_data[list(columns)].to_numpy(dtype=np.float64)
+
+
+@lru_cache(maxsize=32)
+def _load_columns_cached(filepath: str, mtime_ns: int, size: int, columns: tuple) -> np.ndarray:
+    """
+    `_load_columns` for a file on disk, memoized by its absolute path, modification time `mtime_ns`, and `size`
+    """
+    loan_data = _load_columns(filepath, columns, {})
+    # Prevent modification of cached results
+    loan_data.setflags(write=False)
+    return loan_data
+
+
+# Memory available to memoized MultiLoan payoffs, which include the payment history of each loan
+PAYOFF_CACHE_NBYTES = 2 ** 28
+
+@_lru_cache_nbytes(PAYOFF_CACHE_NBYTES)
+def _multiloan_payoff(signature: tuple, amount: float) -> tuple:
+    """
+    Pay off a collection of loans with a recurring payment `amount`, memoized since Payrange may revisit the same
+    loans and amounts. Cached results are limited to `PAYOFF_CACHE_NBYTES` in total.
+    signature: (principal, rate, payment, n, t, stop) of each loan
+    :return: (totalpay, n_payments, loan_totals, loan_payments) (see MultiLoan)
+    """
+    ml = MultiLoan([Loan(*features) for features in signature], amount)
+    ml.pay_remaining()
+    loan_totals = ml.loan_totals
+    loan_payments = ml.loan_payments.copy()
+    # Prevent modification of cached results
+    loan_totals.setflags(write=False)
+    loan_payments.setflags(write=False)
+    return ml.totalpay, ml.n_payments, loan_totals, loan_payments
+
+
+def _multiloan_payoffs(ml: MultiLoan, amounts: list, n_jobs: int) -> list:
+    """
+    Pay off `ml` with each recurring payment in `amounts` in parallel
+    :return: (totalpay, n_payments, loan_totals, loan_payments) for each amount (see `_multiloan_payoff`), or None if
+    the amount could not pay off the loans
+    """
+    status, loan_payments, total_payments = multiloan_payrange(
+        ml._principal_arr, ml._growth_arr, ml._min_arr, ml._stop_arr, np.asarray(amounts, dtype=np.float64),
+        ml._rate_order, n_jobs)
+
+    results = []
+    for st, l_payments, t_payments in zip(status, loan_payments, total_payments):
+        if st != OK:
+            results.append(None)
+            continue
+        # Include initial empty payment, laid out as in MultiLoan
+        l_amounts = np.zeros((len(t_payments) + 1, ml.n_loans))
+        l_amounts[1:] = l_payments
+        l_amounts = l_amounts.T
+        results.append((sum(t_payments.tolist(), 0), len(t_payments), l_amounts.sum(1), l_amounts))
+    return results
+
+
+def _pct_change(totals: np.ndarray) -> np.ndarray:
+    """Percent change from each total to the next along the first axis, with zero change for the last"""
+    pct = np.empty_like(totals, dtype=np.float64)
+    np.subtract(totals[1:], totals[:-1], out=pct[:-1])
+    pct[-1] = 0
+    pct /= totals
+    return pct
+
+
 class Payrange:
     """
     Total payment associated with a range of loan payment values
@@ -384,6 +731,11 @@ class Payrange:
     ----------
     loan: Either a single Loan or a MultiLoan
     payrange: A list of payment amounts (default = 100 to 1000 by increments of 100)
+    n_jobs: Number of threads to pay off a MultiLoan with at once (default 1, -1 to use all processors). Only
+        speeds up when Numba is installed. A single Loan is paid off with all amounts at once in closed form, so this
+        has no effect.
+    dtype: Data type of `loan_amounts` (default np.float64). np.float32 halves its memory and is exact to the cent for
+        payments under $131,072 (2^17). Totals are always kept as np.float64.
 
     Example:
     payrange = [100, 200, 300] will calculate the total cost of a loan at each of these monthly payments
@@ -402,106 +754,122 @@ class Payrange:
     payment value. If a Multiloan is provided, data for the 'total' will also be included (df[df.loan.eq('total')]).
     """
 
-    def __init__(self, loan: Union[Loan, MultiLoan], payrange: Union[list, range, np.array]=None):
+    def __init__(self, loan: Union[Loan, MultiLoan], payrange: Union[list, range, np.array]=None, n_jobs: int=1,
+                 dtype: np.dtype=np.float64):
         # Check Loan input
         if not any(isinstance(loan, t) for t in [Loan, MultiLoan]):
             raise TypeError('"loan" must either be a `Loan` or `MulitLoan` object')
-
-        if not payrange:
+        # Integer types would drop cents
+        if not np.issubdtype(dtype, np.floating):
+            raise TypeError('`dtype` must be a floating point type')
+        if n_jobs == 0 or n_jobs < -1:
+            raise ValueError('`n_jobs` must be a positive number of threads, or -1 to use all processors')
+
+        # Iterators and generators can only be read once
+        if payrange is not None and not hasattr(payrange, '__len__'):
+            payrange = list(payrange)
+        if payrange is None or len(payrange) == 0:
             payrange = range(100, 1100, 100)
         self.payrange = payrange
         self.loan = loan
         # Get balances at each payrange level
-        amounts = []
-        totals = []
-        payments = []
-
-        loan_totals = []
-        loan_amounts = []
-        for amt in payrange:
-            # Reset loan
-            loan.reset()
-            # Payoff entirely with current amount
-            try:
-                loan.pay_remaining(amt)
-            except AssertionError:
+        if isinstance(loan, Loan):
+            # Payoff entirely with each amount at once, using the loan's payment in place of empty amounts as
+            # `Loan.pay_remaining` does
+            recur_amounts = [amt if amt else loan.payment for amt in payrange]
+            sufficient, totals, payments = _payoff_stats_arrays(recur_amounts, loan.principal, loan._g, loan.stop)
+            if not sufficient.all():
                 warn('A payment amount was skipped because it surpassed stop criteria')
-                continue
-            amounts.append(amt)
-            totalpay = loan.totalpay
-            n_payments = loan.n_payments
-
-            totals.append(totalpay)
-            payments.append(n_payments)
+        else:
+            loan._update_features()
 
-            # If Multiloan, save loan-level info too
-            if isinstance(loan, MultiLoan):
-                l_totals = loan.loan_totals
-                l_amounts= loan.loan_payments
+            def payoff(amt):
+                """Payoff entirely with `amt`, or None if it surpassed stop criteria"""
+                try:
+                    return _multiloan_payoff(loan._signature, loan._recur_amount(amt))
+                except AssertionError:
+                    return None
 
-                loan_totals.append(l_totals)
+            if n_jobs == 1:
+                results = map(payoff, payrange)
+            else:
+                results = _multiloan_payoffs(loan, [loan._recur_amount(amt) for amt in payrange], n_jobs)
+
+            n_amounts = len(payrange)
+            sufficient = np.zeros(n_amounts, dtype=bool)
+            totals = np.empty(n_amounts)
+            payments = np.empty(n_amounts, dtype=int)
+            loan_totals = np.empty((n_amounts, loan.n_loans))
+            loan_amounts = []
+            for i, result in enumerate(results):
+                if result is None:
+                    warn('A payment amount was skipped because it surpassed stop criteria')
+                    continue
+                sufficient[i] = True
+                totals[i], payments[i], loan_totals[i], l_amounts = result
+                # Save loan-level payments too
                 loan_amounts.append(l_amounts)
+            totals, payments, loan_totals = totals[sufficient], payments[sufficient], loan_totals[sufficient]
+        amounts = np.asarray(payrange)[sufficient]
 
         # Check that data exists
         assert len(amounts) > 0, 'No payment amount in the provided payrange is sufficient'
 
-        # Calculate percent change in total pays
-        pct_changes = np.append(np.diff(totals), 0) / totals
-
-        total_df = pd.DataFrame([[pr, tp, pc, n_p] for pr, tp, pc, n_p in
-                                    zip(amounts, totals, pct_changes, payments)],
-                                   columns=['amount', 'total', 'pct_change', 'n_payments'])
-
         # Save
-        self.amounts = np.array(amounts)
-        self.totals = np.array(totals)
-        self.payments = np.array(payments)
-        self.pct_change = np.array(pct_changes)
+        self.amounts = amounts
+        self.totals = totals
+        self.payments = payments
+        # Percent change in total pays
+        self.pct_change = _pct_change(self.totals)
         self.loan_totals = None
         self.loan_amounts = None
 
         if isinstance(loan, MultiLoan):
-            self.loan_totals = np.array(loan_totals)
-
-            # Save loan payments
-            n = max([lp.shape[1] for lp in loan_amounts])
-            lps = []
-            for lp in loan_amounts:
-                l = lp.shape[1]
-                n_zeros = n - l
-                lp = np.append(lp, np.zeros((lp.shape[0], n_zeros)), 1)
-                lps.append(lp)
+            self.loan_totals = loan_totals
 
-            self._loan_amounts = loan_amounts
-            self.loan_amounts = np.array(lps)
+            # Save loan payments, padded with zeros after each payoff
+            n = payments.max() + 1
+            lps = np.zeros((len(loan_amounts), self.loan.n_loans, n), dtype=dtype)
+            for i, lp in enumerate(loan_amounts):
+                lps[i, :, :lp.shape[1]] = lp
+            self.loan_amounts = lps
 
             # Loan percent change
-            loan_pct_change = np.vstack(
-                (np.diff(self.loan_totals, axis=0), np.zeros((1, self.loan.n_loans)))) / self.loan_totals
-            self.loan_pct_change = loan_pct_change
-
-            # Make loan_df
-            dfs = []
-            for attr, name in zip(['loan_totals', 'loan_pct_change'], ['total', 'pct_change']):
-                d_wide = pd.DataFrame(getattr(self, attr)).rename_axis(columns='loan')
-                d_wide = d_wide.rename(columns={i: 'loan_%s' % i for i in d_wide})
-                d_wide['n_payments'] = self.payments
-                d_wide['amount'] = self.amounts
-                d_wide = d_wide.set_index(['n_payments', 'amount'])
-                d_stack = d_wide.stack().reset_index(name=name).set_index(['amount', 'n_payments', 'loan'])
-                dfs.append(d_stack)
-            loan_df = pd.concat(dfs, 1).reset_index()
+            self.loan_pct_change = _pct_change(self.loan_totals)
+
+        # DataFrame is built on first access
+        self._df = None
+
+        # Reset loan
+        loan.reset()
+
+    @property
+    def df(self):
+        """DataFrame of the total paid at each payment amount, including each loan if a MultiLoan was provided"""
+        if self._df is None:
+            self._df = self._make_df()
+        return self._df
+
+    def _make_df(self):
+        """Make DataFrame of results"""
+        total_df = pd.DataFrame({'amount': self.amounts, 'total': self.totals, 'pct_change': self.pct_change,
+                                 'n_payments': self.payments})
+
+        if isinstance(self.loan, MultiLoan):
+            # Make loan_df with a row for each loan at each amount
+            n_amounts, n_loans = self.loan_totals.shape
+            loan_df = pd.DataFrame({'amount': np.repeat(self.amounts, n_loans),
+                                    'n_payments': np.repeat(self.payments, n_loans),
+                                    'loan': np.tile(['loan_%s' % i for i in range(n_loans)], n_amounts),
+                                    'total': self.loan_totals.ravel(),
+                                    'pct_change': self.loan_pct_change.ravel()})
 
             # Append total df
             total_df['loan'] = 'total'
-            df = loan_df.append(total_df)
+            df = pd.concat([loan_df, total_df])
         else:
             df = total_df
-
-        self.df = df
-
-        # Reset loan
-        loan.reset()
+        return df
 
     def __repr__(self):
         rep = f'Payrange(low={min(self.amounts)}, high={max(self.amounts)})'
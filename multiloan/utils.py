@@ -1,6 +1,24 @@
+import math
 import numpy as np
+from functools import lru_cache, wraps
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from multiloan._kernels import NUMBA, CYTHON, _loan_balances, _payoff_count
 
 
+@lru_cache(maxsize=4096)
+def growth_factor(r, n, t) -> float:
+    """
+    Growth of a balance from compounding interest over a single period
+    Loans have a fixed rate, so this is cached rather than recomputed each period
+    r: interest rate
+    n: number of times interest compounds in period
+    t: Number of time periods
+
+    g = (1 + r / n) ^ (n * t)
+    """
+    return math.pow(1 + r / n, n * t)
+
 def compint(P, r, n, t) -> float:
     """
     Compute the compounding interest
@@ -11,14 +29,14 @@ def compint(P, r, n, t) -> float:
 
     A = P (1 + r / n) ^ (n * t)
     """
-    A = P * np.power(1 + r / n, n * t)
+    A = P * growth_factor(r, n, t)
     return A
 
 def payment_amount(balance, payment):
     """
-    The amount of a payment given a balance is which ever is less
+    The amount of a `payment` toward a `balance` is which ever is less
     """
-    curr_payment = min(balance, payment)
+    curr_payment = payment if payment < balance else balance
     return curr_payment
 
 def single_payment(payment, P, r, n=365, t=1/12):
@@ -35,7 +53,7 @@ def single_payment(payment, P, r, n=365, t=1/12):
     P = compint(P, r, n, t)
     ## Subtract payment
     # Pay payment amount until principal is zero
-    curr_pay = payment_amount(P, payment)
+    curr_pay = payment if payment < P else P
     P -= curr_pay
 
     # Round
@@ -47,6 +65,17 @@ def pay_loan(payment, P, r, n=365, t=1/12, stop=1e6) -> tuple:
     """
     Pay a compound interest loan to extinction
     Default parameters for daily compounding with monthly payments
+
+    Rather than applying one payment at a time, the schedule is computed in closed form. With a per-period growth
+    factor g = (1 + r / n) ^ (n * t), the balance after k payments is:
+
+    B_k = g^k * P - payment * (g^k - 1) / (g - 1)
+
+    Each balance is rounded to cents from B_k, whereas `single_payment` rounds each balance before accruing interest on
+    it in the next period. Rounding errors of up to half a cent per period grow with interest, so the two schedules can
+    differ by |B_k - single| <= .005 * (1 + (g^k - 1) / (g - 1)), which is cents for long or large loans. The final
+    payment (and rarely the number of payments) can differ accordingly.
+
     :param payment: Payment amount per period
     :param P: principal
     :param r: interest rate
@@ -57,42 +86,166 @@ def pay_loan(payment, P, r, n=365, t=1/12, stop=1e6) -> tuple:
     | balances: balances for each period
     | payments: payments for each period
     """
-    # Keep track of balances after each payment
-    balances = []
-    payments = []
-    while P > 0:
-        P, curr_pay = single_payment(payment, P, r, n, t)
-        assert P <= stop, f'Payments of {money_amount(payment)} have led the balance to reach stopping criteria of' \
-                          f' {money_amount(stop)}.'
-        balances.append(P)
-        payments.append(curr_pay)
+    # Growth of balance over a single pay period
+    g = growth_factor(r, n, t)
+
+    balances, payments = _pay_loan_arrays(payment, P, g, stop)
+    return balances.tolist(), payments.tolist()
+
+def _pay_loan_arrays(payment, P, g, stop=1e6) -> tuple:
+    """
+    Same as `pay_loan` given the growth `g` of the balance over a single pay period, but balances and payments are
+    returned as float arrays
+    """
+    if P <= 0:
+        return np.empty(0), np.empty(0)
+
+    # A payment that doesn't cover the interest of a period can never pay the loan off, so the balance would
+    # eventually reach `stop`. Since the balance only decreases otherwise, its first value is its largest.
+    assert _sufficient(payment, P, g, stop), \
+        f'Payments of {money_amount(payment)} have led the balance to reach stopping criteria of' \
+        f' {money_amount(stop)}.'
+
+    # Balance after each payment
+    if NUMBA or CYTHON:
+        balances = _loan_balances(float(payment), float(P), g)
+    else:
+        k = _payoff_count(float(payment), float(P), g)
+        balances = _balance_after(np.arange(1, k + 1, dtype=np.float64), payment, P, g)
+
+    balances = np.round(balances, 2)
+
+    # The final payment is whatever balance remains after accruing interest
+    payments = np.full(len(balances), round(payment, 2), dtype=np.float64)
+    payments[-1] = round((balances[-2] if len(balances) > 1 else P) * g, 2)
+
+    balances[-1] = 0.
     return balances, payments
 
+def payoff_stats(payments, P, r, n=365, t=1/12, stop=1e6) -> tuple:
+    """
+    Total amount paid and number of payments to pay off a compound interest loan for each of several recurring
+    payment amounts, computed in closed form for all amounts at once (see `pay_loan`)
+    :param payments: Array of payment amounts per period
+    :param P: principal
+    :param r: interest rate
+    :param n: number of times interest compounds in period
+    :param t: payment frequency
+    :param stop: Stop criteria to avoid infinite calculation (default 1 million)
+    :return: (sufficient, totals, n_payments)
+    | sufficient: boolean mask of `payments` that pay off the loan before reaching `stop`
+    | totals: total amount paid for each sufficient payment
+    | n_payments: number of payments for each sufficient payment
+    """
+    # Growth of balance over a single pay period, shared by all amounts
+    g = growth_factor(r, n, t)
+    return _payoff_stats_arrays(payments, P, g, stop)
+
+def _payoff_stats_arrays(payments, P, g, stop=1e6) -> tuple:
+    """
+    Same as `payoff_stats` given the growth `g` of the balance over a single pay period
+    """
+    payments = np.asarray(payments, dtype=np.float64)
+    sufficient = _sufficient(payments, P, g, stop)
+    payments = payments[sufficient]
+
+    if P <= 0:
+        return sufficient, np.zeros(len(payments)), np.zeros(len(payments), dtype=int)
+
+    k = _payoff_periods(payments, P, g)
+    # The final payment is whatever balance remains after accruing interest
+    final_balance = np.where(k > 1, np.round(_balance_after(k - 1, payments, P, g), 2), P)
+    final_pay = np.round(final_balance * g, 2)
+    totals = np.round(payments, 2) * (k - 1) + final_pay
+    return sufficient, totals, k
+
+def _sufficient(payment, P, g, stop):
+    """Whether `payment` pays off principal `P` with growth `g` per period before the balance reaches `stop`"""
+    return (payment > P * (g - 1)) & (P * g - payment <= stop)
+
+def _balance_after(k, payment, P, g):
+    """Balance after `k` payments of `payment` to principal `P` with growth `g` per period"""
+    if g == 1:
+        return P - payment * k
+    gk = np.power(g, k)
+    return gk * P - payment * (gk - 1) / (g - 1)
+
+def _payoff_periods(payment, P, g):
+    """Number of payments of `payment` needed to pay off principal `P` with growth `g` per period"""
+    if g == 1:
+        k = np.ceil(P / payment)
+    else:
+        k = np.ceil(-np.log1p(-P * (g - 1) / payment) / np.log1p(g - 1))
+
+    # Correct for floating point error so that the balance, rounded to cents, is first cleared at payment `k`
+    k = np.where(np.round(_balance_after(k - 1, payment, P, g), 2) <= 0, k - 1, k)
+    k = np.where(np.round(_balance_after(k, payment, P, g), 2) > 0, k + 1, k)
+    return k.astype(int)
+
+def round2(x) -> list:
+    """
+    Round an array of floats to cents as a list
+    Amounts are rounded as `np.round` does, which is how `round` rounds NumPy floats
+    """
+    return np.round(np.asarray(x, dtype=np.float64), 2).tolist()
+
 def money_amount(x: float) -> str:
     """
     Convert a float to a string dollar amount with commas
     Ex. 1000.235 -> $1,000.24
     """
-    # Round to hundreds
-    rounded = '%.2f' % x
-    # Split into dollars and cents
-    dollars, cents = rounded.split('.')
-
-    # Add commas every three digits to dollars
-    rev_dollars = ''
-    count = 0
-    for i in dollars[::-1]:
-        rev_dollars += i
-        count += 1
-        # Add comma
-        if count == 3:
-            rev_dollars += ','
-            count = 0
-
-    # Flip reversed representation
-    ref_dollars = rev_dollars.rstrip(',')[::-1]
-
-    # Final format
-    ref_amt = f'${ref_dollars}.{cents}'
-    return ref_amt
+    return f'${x:,.2f}'
+
+def money_amounts(x) -> list:
+    """
+    Convert an array of floats to string dollar amounts with commas (see `money_amount`)
+    """
+    return [f'${v:,.2f}' for v in np.asarray(x, dtype=np.float64).tolist()]
+
+_CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'max_nbytes', 'nbytes'])
+
+def _lru_cache_nbytes(max_nbytes: int):
+    """
+    Like `functools.lru_cache`, but bounded by the total size of the arrays in cached results rather than their number
+    Least recently used results are dropped to make room, and results larger than `max_nbytes` aren't cached
+    """
+    def decorator(func):
+        cache = OrderedDict()
+        info = {'hits': 0, 'misses': 0, 'nbytes': 0}
+        lock = Lock()
+
+        def result_nbytes(result):
+            return sum(value.nbytes for value in result if isinstance(value, np.ndarray))
+
+        @wraps(func)
+        def wrapper(*args):
+            with lock:
+                if args in cache:
+                    cache.move_to_end(args)
+                    info['hits'] += 1
+                    return cache[args]
+                info['misses'] += 1
+            result = func(*args)
+            nbytes = result_nbytes(result)
+            with lock:
+                if nbytes <= max_nbytes and args not in cache:
+                    cache[args] = result
+                    info['nbytes'] += nbytes
+                    while info['nbytes'] > max_nbytes:
+                        _, dropped = cache.popitem(last=False)
+                        info['nbytes'] -= result_nbytes(dropped)
+            return result
+
+        def cache_info():
+            with lock:
+                return _CacheInfo(info['hits'], info['misses'], max_nbytes, info['nbytes'])
+
+        def cache_clear():
+            with lock:
+                cache.clear()
+                info.update(hits=0, misses=0, nbytes=0)
 
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorator
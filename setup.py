@@ -1,7 +1,19 @@
-from setuptools import setup
+from setuptools import setup, Extension
 from multiloan import __version__
 
 dependencies = ['numpy', 'pandas']
+extras = {'numba': ['numba']}
+
+# Compile Cython kernels, used when Numba is not installed, if Cython is available. The plain Python kernels are used
+# if they fail to build (ex. without a C compiler).
+try:
+    from Cython.Build import cythonize
+    ext_modules = cythonize([Extension('multiloan._cykernels', ['multiloan/_cykernels.pyx'])])
+    # Set after cythonize, which doesn't carry `optional` over to the extensions it returns
+    for ext in ext_modules:
+        ext.optional = True
+except ImportError:
+    ext_modules = []
 
 with open('README.md') as fh:
     long_description = fh.read()
@@ -11,6 +23,8 @@ setup(
     version=__version__,
     packages=['multiloan'],
     install_requires=dependencies,
+    extras_require=extras,
+    ext_modules=ext_modules,
     url='',
     license='MIT',
     author='michaelsilverstein',
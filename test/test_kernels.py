@@ -0,0 +1,96 @@
+"""Test compiled kernels"""
+
+from unittest import TestCase
+import numpy as np
+from multiloan._kernels import _multiloan_period, _multiloan_pay_remaining, _loan_balances, _payoff_count, OK, \
+    INSUFFICIENT_PAYMENT, _round_cents
+from multiloan.utils import growth_factor
+
+
+class TestKernels(TestCase):
+    def setUp(self):
+        self.balances = np.array([1000., 2000., 50.])
+        self.growth = np.array([1.01, 1.02, 1.])
+        self.payments_min = np.array([100., 100., 100.])
+        self.stops = np.full(3, 1e6)
+        # Highest rate first
+        self.rate_order = np.array([1, 0, 2])
+
+    def test_period_waterfall(self):
+        """Payment beyond the minimums should go to loans in order of rate"""
+        new_balances = np.empty(3)
+        payments = np.empty(3)
+        min_total, balance_total, payment_total = _multiloan_period(
+            self.balances, self.growth, self.payments_min, 500., self.rate_order, new_balances, payments)
+
+        # Minimum for last loan is capped at its balance, the rest goes to the highest rate loan
+        self.assertEqual(min_total, 250.)
+        self.assertEqual(list(payments), [100., 350., 50.])
+        self.assertEqual(list(new_balances), [910., 1690., 0.])
+        self.assertEqual(balance_total, 2600.)
+        self.assertEqual(payment_total, 500.)
+
+    def test_round_cents(self):
+        """Python and NumPy floats should be rounded to cents the same way"""
+        self.assertEqual(_round_cents(2.675), 2.68)
+        self.assertEqual(_round_cents(np.float64(2.675)), 2.68)
+        self.assertEqual(_round_cents(1.005), np.round(1.005, 2))
+
+    def test_period_half_cent(self):
+        """A half cent of payment beyond the minimums should be rounded half to even"""
+        balances = np.array([41448.9, 16520.17, 20416.55])
+        growth = np.array([growth_factor(r, 365, 1 / 12) for r in [.025, .072, .011]])
+        payments_min = np.array([218.82, 130.36, 168.12])
+        new_balances = np.empty(3)
+        payments = np.empty(3)
+        _multiloan_period(balances, growth, payments_min, 798.305, np.array([1, 0, 2]), new_balances, payments)
+
+        self.assertEqual(list(payments), [218.82, 411.36, 168.12])
+        self.assertEqual(list(new_balances), [41316.52, 16208.22, 20267.15])
+
+    def test_period_waterfall_capped(self):
+        """A loan should take no more than its balance after interest, with the rest going to the next loan"""
+        new_balances = np.empty(3)
+        payments = np.empty(3)
+        rate_order = np.array([2, 1, 0])
+        _multiloan_period(self.balances, self.growth, self.payments_min, 500., rate_order, new_balances, payments)
+
+        self.assertEqual(list(payments), [100., 350., 50.])
+        self.assertEqual(list(new_balances), [910., 1690., 0.])
+
+    def test_pay_remaining(self):
+        """Paying off should clear every balance"""
+        loan_balances, loan_payments, total_balances, total_payments, status, value = _multiloan_pay_remaining(
+            self.balances, self.growth, self.payments_min, self.stops, 500., self.rate_order)
+
+        self.assertEqual(status, OK)
+        self.assertEqual(list(loan_balances[-1]), [0., 0., 0.])
+        self.assertEqual(total_balances[-1], 0.)
+        self.assertEqual(list(loan_payments.sum(1)), list(total_payments))
+
+    def test_insufficient_payment(self):
+        """Paying less than the sum of minimums should stop before the first payment"""
+        loan_balances, loan_payments, total_balances, total_payments, status, value = _multiloan_pay_remaining(
+            self.balances, self.growth, self.payments_min, self.stops, 200., self.rate_order)
+
+        self.assertEqual(status, INSUFFICIENT_PAYMENT)
+        self.assertEqual(value, 250.)
+        self.assertEqual(len(loan_balances), 0)
+
+    def test_loan_balances(self):
+        """Balances should be cleared, once rounded to cents, at the final payment"""
+        balances = np.round(_loan_balances(100., 1000., 1.01), 2)
+
+        self.assertEqual(len(balances), _payoff_count(100., 1000., 1.01))
+        self.assertEqual(balances[0], 910.)
+        self.assertLessEqual(balances[-1], 0)
+        self.assertTrue((balances[:-1] > 0).all())
+
+    def test_loan_balances_recurrence(self):
+        """Closed form balances should match applying each payment in turn"""
+        balances = _loan_balances(100., 1000., 1.01)
+
+        balance = 1000.
+        for closed in balances:
+            balance = balance * 1.01 - 100.
+            self.assertAlmostEqual(closed, balance, places=9)
@@ -1,8 +1,12 @@
 """Test loan classes"""
 
 from unittest import TestCase
-from multiloan.loans import Loan, MultiLoan, Payrange
+from multiloan.loans import Loan, MultiLoan, Payrange, _load_columns_cached, _multiloan_payoff, PAYOFF_CACHE_NBYTES
+from multiloan.utils import money_amount, round2, _lru_cache_nbytes
 import os
+import tempfile
+from io import StringIO
+import numpy as np
 from warnings import simplefilter
 
 
@@ -19,6 +23,15 @@ class TestLoan(TestCase):
         loan.pay_remaining()
         self.assertEqual(loan.balance, 0)
 
+    def test_payremaining_mortgage(self):
+        """A 30 year mortgage at 6% per year, compounding monthly, should be paid off in 360 monthly payments"""
+        loan = Loan(2e5, .06 / 12, 1199.11, n=1, t=1)
+        loan.pay_remaining()
+
+        self.assertEqual(loan.n_payments, 360)
+        self.assertEqual(loan.balance, 0)
+        self.assertLess(loan.payments[-1], 1199.11)
+
     def test_reset(self):
         """Test resetting loan"""
         loan = self.loan
@@ -55,6 +68,115 @@ class TestLoan(TestCase):
         self.assertTrue(list(loan.balances > 0))
 
         self.assertTrue(list(loan.payments > 0))
+        self.assertTrue(loan.all_positive)
+
+        # Nothing paid
+        loan = Loan(self.principal, self.rate)
+        loan.pay_one()
+        self.assertFalse(loan.all_positive)
+
+    def test_str(self):
+        """Test that the summary reports the running totals"""
+        loan = self.loan
+        loan.pay_remaining()
+
+        summary = str(loan)
+        self.assertIn(f'Total amount paid: {money_amount(round(loan.payments.sum(), 2))}', summary)
+        self.assertIn(f'Number of payments: {len(loan.payments) - 1}', summary)
+
+    def test_payremaining_repeated(self):
+        """Paying off again should leave the history of a paid off loan unchanged"""
+        loan = self.loan
+        loan.pay_remaining()
+        balances, totalpay = list(loan.balances), loan.totalpay
+        loan.pay_remaining()
+
+        self.assertEqual(list(loan.balances), balances)
+        self.assertEqual(loan.totalpay, totalpay)
+
+    def test_totalpay(self):
+        """Running total paid should match payment history and be cleared on reset"""
+        loan = self.loan
+        loan.pay_one()
+        loan.pay_one(500)
+        loan.pay_remaining()
+
+        self.assertAlmostEqual(loan.totalpay, loan.payments.sum(), places=6)
+        loan.reset()
+        self.assertEqual(loan.totalpay, 0)
+
+    def test_totalpay_precision(self):
+        """Total paid over many payments should not drift from the exact sum"""
+        loan = Loan(1e6, .01, 100.01)
+        for _ in range(1000):
+            loan.pay_one()
+
+        self.assertEqual(loan.totalpay, 100010.)
+
+    def test_df(self):
+        """DataFrame should have a row for each payment"""
+        loan = self.loan
+        loan.pay_remaining()
+        df = loan.df
+
+        self.assertEqual(list(df.columns), ['amount', 'balance', 'payment'])
+        self.assertEqual(list(df.amount), list(loan.payments))
+        self.assertEqual(list(df.balance), list(loan.balances))
+        self.assertEqual(list(df.payment), list(range(loan.n_payments + 1)))
+        self.assertEqual(df.payment.dtype, np.int64)
+
+    def test_set_rate(self):
+        """Changing the rate, compounding, or pay period of a loan should change how it grows"""
+        for feature, value in [('rate', .10), ('n', 12), ('t', 1 / 26)]:
+            loan = Loan(self.principal, self.rate, self.payment)
+            setattr(loan, feature, value)
+            loan.pay_remaining()
+            features = {'principal': self.principal, 'rate': self.rate, 'payment': self.payment, feature: value}
+            expected = Loan(**features)
+            expected.pay_remaining()
+
+            self.assertEqual(list(loan.balances), list(expected.balances))
+            self.assertEqual(loan.totalpay, expected.totalpay)
+
+        self.loan.rate = .10
+        self.loan.pay_remaining()
+        self.assertEqual(self.loan.n_payments, 66)
+
+    def test_from_arrays(self):
+        """Loans made in bulk should match loans made individually, and keep separate histories"""
+        principals = [1e4, 2e4, 1e4]
+        rates = [.05, .03, .05]
+        payments = [200, 100, 300]
+        loans = Loan.from_arrays(principals, rates, payments)
+        expected = [Loan(p, r, pay) for p, r, pay in zip(principals, rates, payments)]
+
+        for loan, other in zip(loans, expected):
+            for attr in ['principal', 'rate', 'payment', 'n', 't', 'stop', '_g']:
+                self.assertEqual(getattr(loan, attr), getattr(other, attr))
+            loan.pay_remaining()
+            other.pay_remaining()
+            self.assertEqual(list(loan.balances), list(other.balances))
+            self.assertEqual(list(loan.payments), list(other.payments))
+            self.assertEqual(loan.totalpay, other.totalpay)
+
+    def test_from_arrays_lengths(self):
+        """Loans can't be made in bulk from arrays of different lengths"""
+        with self.assertRaises(ValueError) as error:
+            Loan.from_arrays([1e4, 2e4], [.05, .03], [200])
+
+        self.assertEqual(str(error.exception), '`principals`, `rates`, and `payments` must have the same length')
+
+    def test_from_arrays_subclass(self):
+        """Loans made in bulk should be set up by a subclass's `__init__`"""
+        class LabeledLoan(Loan):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.label = 'student'
+
+        loans = LabeledLoan.from_arrays([1e4, 2e4], [.05, .03], [200, 100])
+
+        self.assertEqual([loan.label for loan in loans], ['student', 'student'])
+        self.assertEqual([loan.principal for loan in loans], [1e4, 2e4])
 
 class TestMultiloan(TestCase):
     def setUp(self):
@@ -81,6 +203,16 @@ class TestMultiloan(TestCase):
 
         self.assertTrue(ml_balance == ml_principal == ml_loan_principals == principal_sums)
 
+    def test_principal_sum(self):
+        """Total principal should be summed like the balances of each payment period"""
+        loans = [Loan(p, r, pay) for p, r, pay in zip([18111.14, 27571.92, 20844.09, 15260.51], [.009, .059, .026, .016],
+                                                      [299.43, 332.97, 478.07, 187.24])]
+        ml = MultiLoan(loans, 2661.94)
+        ml.pay_remaining()
+
+        self.assertEqual(ml.principal, sum(loan.principal for loan in loans))
+        self.assertEqual(ml._balances, [sum(balances) for balances in ml.loan_balances.T.tolist()])
+
     def test_fail_multiple_inputs(self):
         """Only a list of loans or a file should be allowed to be provided"""
         # Try to load a list of loans and a file
@@ -106,6 +238,70 @@ class TestMultiloan(TestCase):
 
         self.assertEqual(balances_manual, balances_file)
 
+    def test_load_file_columns(self):
+        """Only the loan columns should be read from a file, with any column names"""
+        table = StringIO('name,amount,interest,minimum\nstudent,1000,.03,200\ncar,10000,.04,300\nhome,100000,.05,400\n')
+        ml = MultiLoan(filepath=table, payment=100000, principal_col='amount', rate_col='interest',
+                       payment_col='minimum')
+        ml.pay_remaining()
+        self.multiloan.pay_remaining()
+
+        self.assertEqual(ml._balances, self.multiloan._balances)
+
+    def test_load_file_floats(self):
+        """Loan features should be read as floats, even if written as integers"""
+        ml = MultiLoan(filepath=StringIO('principal,rate,payment\n1000,0,200\n'), payment=1000)
+        loan = ml.Loans[0]
+
+        self.assertEqual([type(loan.principal), type(loan.rate), type(loan.payment)], [float, float, float])
+        self.assertEqual(ml._principal_arr.dtype, np.float64)
+
+    def test_load_file_cached(self):
+        """A file should only be read again once it has been modified"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filepath = os.path.join(tmpdir, 'loans.csv')
+            with open(filepath, 'w') as fh:
+                fh.write('principal,rate,payment\n1000,.03,200\n')
+            _load_columns_cached.cache_clear()
+            MultiLoan(filepath=filepath, payment=1000)
+            MultiLoan(filepath=filepath, payment=1000)
+            self.assertEqual(_load_columns_cached.cache_info().hits, 1)
+
+            with open(filepath, 'w') as fh:
+                fh.write('principal,rate,payment\n2000,.03,200\n')
+            mtime_ns = os.stat(filepath).st_mtime_ns + 10 ** 9
+            os.utime(filepath, ns=(mtime_ns, mtime_ns))
+            self.assertEqual(MultiLoan(filepath=filepath, payment=1000).principal, 2000)
+
+    def test_load_file_cached_relative(self):
+        """Files with the same relative path in different directories should not share cached data"""
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            mtime_ns = os.stat(tmpdir).st_mtime_ns
+            principals = []
+            for i, principal in enumerate([1000, 2000]):
+                dirpath = os.path.join(tmpdir, str(i))
+                os.mkdir(dirpath)
+                filepath = os.path.join(dirpath, 'loans.csv')
+                with open(filepath, 'w') as fh:
+                    fh.write('principal,rate,payment\n%s,.03,200\n' % principal)
+                os.utime(filepath, ns=(mtime_ns, mtime_ns))
+                try:
+                    os.chdir(dirpath)
+                    principals.append(MultiLoan(filepath='loans.csv', payment=1000).principal)
+                finally:
+                    os.chdir(cwd)
+            self.assertEqual(principals, [1000, 2000])
+
+    def test_load_url(self):
+        """Paths that aren't files on disk should be read by pandas without caching"""
+        filepath = os.path.join(os.path.dirname(__file__), 'test_loan_table.csv')
+        _load_columns_cached.cache_clear()
+        ml = MultiLoan(filepath='file://' + os.path.abspath(filepath), payment=1e4)
+
+        self.assertEqual(ml.principal, MultiLoan(filepath=filepath, payment=1e4).principal)
+        self.assertEqual(_load_columns_cached.cache_info().currsize, 1)
+
     def test_fail_bad_loan_list(self):
         """If a list of loans provided, all must be Loan object"""
         bad_list = self.loans + ['test']
@@ -123,6 +319,33 @@ class TestMultiloan(TestCase):
         self.assertEqual(str(error.exception), 'Multiloan payment ($500.00) must exceed the sum of recurring '
                                                'payments for each Loan ($900.00)')
 
+    def test_fail_stop(self):
+        """Fail a payment that never pays off the loans"""
+        ml = MultiLoan([Loan(1e5, .5, 10)], 10)
+        with self.assertRaises(AssertionError) as error:
+            ml.pay_remaining()
+
+        self.assertEqual(str(error.exception), 'Payments of $10.00 have led the balance to reach stopping criteria of '
+                                               '$1,000,000.00.')
+
+    def test_rate_order_ties(self):
+        """Payment beyond the minimums goes to the last provided of loans with equal rates"""
+        ml = MultiLoan([Loan(1e3, .04, 100), Loan(1e3, .05, 100), Loan(1e3, .05, 100)], 500)
+        ml.pay_one()
+
+        first, second, third = ml.loan_payments[:, 1]
+        self.assertEqual((first, second), (100, 100))
+        self.assertEqual(third, 300)
+
+    def test_long_payoff(self):
+        """History should grow past its initial size for payoffs with many payments"""
+        ml = MultiLoan([Loan(1e4, 0, 2)], 2)
+        ml.pay_remaining()
+
+        self.assertEqual(ml.n_payments, 5000)
+        self.assertEqual(ml.balance, 0)
+        self.assertEqual(ml.loan_payments.shape, (1, 5001))
+
     def test_loan_history_equals_multi(self):
         """Sum of payments and balances of each loan should equal that of mulitloan"""
 
@@ -142,6 +365,127 @@ class TestMultiloan(TestCase):
 
         self.assertEqual(loan_payments_sum, ml_payments)
 
+    def test_payone_and_remaining(self):
+        """Test that paying once matches the first payment in full pay off"""
+        ml = self.multiloan
+        ml.pay_one()
+        one_pay_balances = list(ml.loan_balances[:, 1])
+        one_pay_payments = list(ml.loan_payments[:, 1])
+
+        ml.reset()
+        ml.pay_remaining()
+
+        self.assertEqual(one_pay_balances, list(ml.loan_balances[:, 1]))
+        self.assertEqual(one_pay_payments, list(ml.loan_payments[:, 1]))
+
+    def test_loan_history(self):
+        """Loan history from the multiloan should match its rows of loan history"""
+        ml = self.multiloan
+        ml.pay_remaining()
+
+        for i, loan in enumerate(self.loans):
+            history = ml.loan_history(i)
+            self.assertIsNot(history, loan)
+            self.assertEqual(list(history.balances), list(ml.loan_balances[i]))
+            self.assertEqual(list(history.payments), list(ml.loan_payments[i]))
+            self.assertEqual(history.n_payments, ml.n_payments)
+            self.assertAlmostEqual(history.totalpay, ml.loan_totals[i])
+            self.assertEqual(history.balance, 0)
+
+    def test_df(self):
+        """DataFrame should have a row for each payment of each loan and the total"""
+        ml = self.multiloan
+        ml.pay_remaining()
+        df = ml.df
+
+        self.assertEqual(list(df.columns), ['loan', 'amount', 'balance', 'payment'])
+        self.assertEqual(len(df), (ml.n_payments + 1) * (len(self.loans) + 1))
+        self.assertEqual(list(df[df.loan.eq('loan_1')].balance), list(ml.loan_balances[1]))
+        self.assertEqual(list(df[df.loan.eq('total')].amount), ml._payments)
+
+    def test_loans_follow_history(self):
+        """Each loan should have its payment history from the multiloan"""
+        ml = self.multiloan
+        ml.pay_remaining()
+
+        self.assertEqual(ml.loan_balances.shape, (len(self.loans), ml.n_payments + 1))
+        self.assertEqual(ml.loan_payments.shape, ml.loan_balances.shape)
+        for i, loan in enumerate(self.loans):
+            self.assertEqual(list(loan.balances), list(ml.loan_balances[i]))
+            self.assertEqual(list(loan.payments), list(ml.loan_payments[i]))
+            self.assertEqual(loan.n_payments, ml.n_payments)
+            self.assertAlmostEqual(loan.totalpay, ml.loan_totals[i])
+            self.assertTrue(loan.df.equals(ml.loan_history(i).df))
+
+    def test_loans_reset(self):
+        """Resetting the multiloan should reset the history of each loan"""
+        ml = self.multiloan
+        ml.pay_remaining()
+        self.loans[0].balance
+        ml.reset()
+
+        for loan, principal in zip(self.loans, self.prinicipals):
+            self.assertEqual(list(loan.balances), [principal])
+            self.assertEqual(list(loan.payments), [0])
+            self.assertEqual(loan.totalpay, 0)
+
+    def test_loans_copied_when_read(self):
+        """Loan histories should only be copied from the multiloan when read, and again after each payment"""
+        ml = self.multiloan
+        loan = self.loans[0]
+        ml.pay_one()
+        self.assertIsNone(loan._synced)
+
+        self.assertEqual(list(loan.balances), list(ml.loan_balances[0]))
+        ml.pay_one()
+        self.assertEqual(list(loan.balances), list(ml.loan_balances[0]))
+        self.assertEqual(loan.n_payments, 2)
+
+    def test_loan_paid_directly(self):
+        """A loan paid directly should keep its history from the multiloan and stop following it until reset"""
+        ml = self.multiloan
+        loan = self.loans[0]
+        ml.pay_one()
+        loan.pay_one()
+        ml.pay_one()
+
+        self.assertEqual(loan.n_payments, 2)
+        self.assertEqual(loan.payments[1], ml.loan_payments[0, 1])
+        self.assertEqual(loan.payments[2], loan.payment)
+
+        ml.reset()
+        ml.pay_one()
+        self.assertEqual(list(loan.balances), list(ml.loan_balances[0]))
+
+    def test_loans_follow_latest_multiloan(self):
+        """Loans given to several multiloans should follow the most recent"""
+        ml = MultiLoan(self.loans, 2000)
+        ml.pay_remaining()
+
+        self.assertEqual(self.loans[2].n_payments, ml.n_payments)
+        self.assertNotEqual(ml.n_payments, self.multiloan.n_payments)
+
+    def test_loan_changes(self):
+        """Changes to a loan should apply to the multiloan from the next payment, or the next reset for principal"""
+        ml = MultiLoan(self.loans, 2000)
+        ml.pay_one()
+        self.loans[0].payment = 400
+        self.loans[1].rate = .10
+        ml.pay_one()
+
+        self.assertEqual(list(ml.loan_payments[0, 1:]), [200, 400])
+        self.assertGreater(ml.loan_payments[1, 2], ml.loan_payments[2, 2])
+
+        self.loans[2].principal = 5e4
+        self.assertEqual(ml.loan_balances[2, 0], self.prinicipals[2])
+        ml.reset()
+        ml.pay_remaining()
+        expected = MultiLoan([Loan(1e3, .03, 400), Loan(1e4, .10, 300), Loan(5e4, .05, 400)], 2000)
+        expected.pay_remaining()
+        self.assertEqual(ml.principal, expected.principal)
+        self.assertEqual(ml._balances, expected._balances)
+        self.assertEqual(list(Payrange(ml, [1e4]).totals), list(Payrange(expected, [1e4]).totals))
+
     def test_all_positive(self):
         """Test that all payments and balances are positive"""
         ml = self.multiloan
@@ -151,6 +495,7 @@ class TestMultiloan(TestCase):
         self.assertTrue(list(ml.balances > 0))
 
         self.assertTrue(list(ml.payments > 0))
+        self.assertTrue(ml.all_positive)
 
     def test_loan_totals(self):
         """Test that loan totals sum to multiloan total"""
@@ -159,11 +504,62 @@ class TestMultiloan(TestCase):
 
         self.assertTrue(round(ml.loan_totals.sum(), 2) == ml.totalpay == ml.payments.sum())
 
+    def test_running_totals(self):
+        """Running totals should match payment history after paying once and then paying off"""
+        ml = self.multiloan
+        ml.pay_one()
+        ml.pay_remaining()
+
+        self.assertEqual(ml.totalpay, sum(ml._payments))
+        self.assertEqual(ml.n_payments, len(ml._payments) - 1)
+        self.assertEqual(ml.balance, 0)
+
+    def test_many_loans(self):
+        """Paying many loans one period at a time should match paying them off at once"""
+        rng = np.random.default_rng(0)
+        principals = np.round(rng.uniform(1e3, 5e4, 200), 2)
+        rates = np.round(rng.uniform(0, .1, 200), 3)
+        loans = Loan.from_arrays(principals, rates, np.round(principals / 100, 2))
+        ml = MultiLoan(loans, 1e5)
+        ml.pay_remaining()
+
+        stepped = MultiLoan(loans, 1e5)
+        while stepped.balance > 0:
+            stepped.pay_one()
+
+        self.assertEqual(stepped._balances, ml._balances)
+        self.assertTrue((stepped.loan_payments == ml.loan_payments).all())
+
+    def test_payremaining_repeated(self):
+        """Paying off again should leave the history of a paid off MultiLoan unchanged"""
+        ml = self.multiloan
+        ml.pay_remaining()
+        balances, totalpay = ml._balances, ml.totalpay
+        ml.pay_remaining()
+
+        self.assertEqual(ml._balances, balances)
+        self.assertEqual(ml.totalpay, totalpay)
+
+    def test_balance_history(self):
+        """Total balance of each payment period should be the sum of the loan balances"""
+        ml = self.multiloan
+        for _ in range(3):
+            ml.pay_one(2000)
+        ml.pay_remaining(2000)
+
+        np.testing.assert_allclose(ml.balances, ml.loan_balances.sum(0), atol=1e-6)
+
 class TestPayRange(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Read the loan table once. Each test makes its own loans, since MultiLoans record their history on them.
+        filepath = os.path.join(os.path.dirname(__file__), 'test_loan_table.csv')
+        cls.loan_table = np.loadtxt(filepath, delimiter=',', skiprows=1)
+
     def setUp(self):
         # Create a multiloan
-        filepath = os.path.join(os.path.dirname(__file__), 'test_loan_table.csv')
-        ml = MultiLoan(filepath=filepath, payment=10000)
+        self.loans = Loan.from_arrays(*self.loan_table.T)
+        ml = MultiLoan(self.loans, payment=10000)
         self.multiloan = ml
 
         # Create a payrange
@@ -177,18 +573,150 @@ class TestPayRange(TestCase):
         sum_loan_payments = pr.loan_amounts.sum(2)
 
         for lt, slp in zip(loan_totals, sum_loan_payments):
-            rounded_lt = [round(i, 2) for i in lt]
-            rounded_slp = [round(i, 2) for i in slp]
-            self.assertEqual(rounded_lt, rounded_slp)
+            self.assertEqual(round2(lt), round2(slp))
 
     def test_totals_loan_totals(self):
         """Sum of loan totals should equal totals"""
         pr = self.pr_multi
 
-        totals = [round(i, 2) for i in pr.totals]
-        sum_loan_totals = [round(i, 2) for i in pr.loan_totals.sum(1)]
+        self.assertEqual(round2(pr.totals), round2(pr.loan_totals.sum(1)))
+
+    def test_df(self):
+        """DataFrame should have a row for each loan and the total at each amount"""
+        pr = self.pr_multi
+        df = pr.df
+
+        self.assertEqual(list(df.columns), ['amount', 'n_payments', 'loan', 'total', 'pct_change'])
+        self.assertEqual(len(df), len(pr.amounts) * (self.multiloan.n_loans + 1))
+
+        total_df = df[df.loan.eq('total')]
+        self.assertEqual(list(total_df.amount), list(pr.amounts))
+        self.assertEqual(list(total_df.total), list(pr.totals))
+        loan_df = df[df.loan.eq('loan_0')]
+        self.assertEqual(list(loan_df.total), list(pr.loan_totals[:, 0]))
+
+    def test_memoized(self):
+        """Repeating a sweep over the same loans should reuse each payoff"""
+        _multiloan_payoff.cache_clear()
+        pr = Payrange(self.multiloan, range(900, 1200, 50))
+        pr_repeat = Payrange(self.multiloan, range(900, 1200, 50))
+
+        self.assertEqual(_multiloan_payoff.cache_info().hits, len(pr.amounts))
+        self.assertEqual(list(pr_repeat.totals), list(pr.totals))
+        self.assertLessEqual(_multiloan_payoff.cache_info().nbytes, PAYOFF_CACHE_NBYTES)
+
+    def test_memo_bounded(self):
+        """Memoized results should be dropped, least recently used first, to stay within their memory limit"""
+        @_lru_cache_nbytes(3 * 80)
+        def zeros(n):
+            return 'zeros', np.zeros(n)
+
+        for n in [10, 10, 5, 20, 10, 31]:
+            zeros(n)
+        info = zeros.cache_info()
+
+        self.assertEqual((info.hits, info.misses), (1, 5))
+        self.assertEqual(info.nbytes, 240)
+        zeros(20)
+        zeros(5)
+        self.assertEqual(zeros.cache_info().hits, 2)
+
+    def test_parallel(self):
+        """Paying off in parallel should match paying off serially"""
+        pr = Payrange(self.multiloan, range(1200, 1500, 50), n_jobs=2)
+        pr_serial = Payrange(self.multiloan, range(1200, 1500, 50))
+
+        self.assertEqual(list(pr.totals), list(pr_serial.totals))
+        self.assertTrue((pr.loan_amounts == pr_serial.loan_amounts).all())
+
+    def test_parallel_warning(self):
+        """Amounts that can't pay off the loans should be skipped with a warning, in parallel as serially"""
+        with self.assertWarns(UserWarning):
+            pr = Payrange(self.multiloan, range(800, 1200, 50), n_jobs=2)
+
+        self.assertEqual(list(pr.amounts), list(self.pr_multi.amounts))
+        self.assertEqual(list(pr.totals), list(self.pr_multi.totals))
+
+    def test_float32(self):
+        """Loan amounts can be stored in single precision"""
+        pr = Payrange(self.multiloan, range(900, 1200, 50), dtype=np.float32)
+
+        self.assertEqual(pr.loan_amounts.dtype, np.float32)
+        self.assertTrue(np.allclose(pr.loan_amounts, self.pr_multi.loan_amounts, rtol=0, atol=.005))
+        self.assertTrue((np.round(pr.loan_amounts.astype(np.float64), 2) == self.pr_multi.loan_amounts).all())
+        self.assertEqual(list(pr.totals), list(self.pr_multi.totals))
+
+    def test_float32_cents(self):
+        """Single precision should hold every amount in cents below $131,072, but not above"""
+        cents = np.arange(13107200) / 100
+        self.assertTrue((np.round(cents.astype(np.float32).astype(np.float64), 2) == cents).all())
+        self.assertEqual(round2(np.float32(131071.99)), 131071.99)
+        self.assertNotEqual(round2(np.float32(150000.01)), 150000.01)
+
+    def test_single_loan(self):
+        """Payrange of a single loan should match paying off the loan with each amount"""
+        loan = Loan(1e4, .05)
+        pr = Payrange(loan, range(100, 1100, 100))
+
+        for amount, total, n_payments in zip(pr.amounts, pr.totals, pr.payments):
+            loan.reset()
+            loan.pay_remaining(amount)
+            self.assertAlmostEqual(total, loan.totalpay)
+            self.assertEqual(n_payments, loan.n_payments)
+
+    def test_single_loan_default_payment(self):
+        """An amount of 0 should pay off a single loan with its payment, as with a MultiLoan"""
+        loan = Loan(1e4, .05, 300)
+        pr = Payrange(loan, [0, 500])
+        loan.pay_remaining()
+
+        self.assertEqual(list(pr.amounts), [0, 500])
+        self.assertAlmostEqual(pr.totals[0], loan.totalpay)
+        self.assertEqual(pr.payments[0], loan.n_payments)
+
+    def test_array_payrange(self):
+        """Payment amounts can be provided as an array"""
+        loan = Loan(1e4, .05)
+        pr = Payrange(loan, np.arange(100, 1100, 100))
+
+        self.assertEqual(list(pr.totals), list(Payrange(loan, range(100, 1100, 100)).totals))
+
+    def test_generator_payrange(self):
+        """Payment amounts can be provided by a generator or iterator"""
+        loan = Loan(1e4, .05)
+        expected = Payrange(loan, range(100, 1100, 100))
+
+        for payrange in [(amount for amount in range(100, 1100, 100)), iter(range(100, 1100, 100))]:
+            pr = Payrange(loan, payrange)
+            self.assertEqual(list(pr.amounts), list(expected.amounts))
+            self.assertEqual(list(pr.totals), list(expected.totals))
+        pr = Payrange(self.multiloan, (amount for amount in range(900, 1200, 50)))
+        self.assertEqual(list(pr.totals), list(self.pr_multi.totals))
+
+    def test_single_loan_warning(self):
+        """Amounts that can't pay off a single loan should be skipped with a warning"""
+        loan = Loan(1e4, .05)
+        with self.assertWarns(UserWarning):
+            pr = Payrange(loan, [10, 100, 200])
+
+        self.assertEqual(list(pr.amounts), [100, 200])
+        self.assertEqual(len(pr.totals), 2)
+
+    def test_fail_dtype(self):
+        """Loan amounts can only be stored as floats"""
+        with self.assertRaises(TypeError) as error:
+            Payrange(self.multiloan, range(900, 1200, 50), dtype=np.int64)
+
+        self.assertEqual(str(error.exception), '`dtype` must be a floating point type')
+
+    def test_fail_n_jobs(self):
+        """Payoffs can only run on a positive number of threads, or all processors"""
+        for n_jobs in [0, -2]:
+            with self.assertRaises(ValueError) as error:
+                Payrange(self.multiloan, range(900, 1200, 50), n_jobs=n_jobs)
 
-        self.assertEqual(totals, sum_loan_totals)
+            self.assertEqual(str(error.exception),
+                             '`n_jobs` must be a positive number of threads, or -1 to use all processors')
 
     def test_pr_fail(self):
         """Payrange should fail if none of the amounts are sufficient"""
@@ -1,14 +1,16 @@
 """Test utility functions"""
 
 from unittest import TestCase
-from multiloan.utils import money_amount, pay_loan
+import numpy as np
+from multiloan.utils import money_amount, money_amounts, round2, pay_loan, single_payment, growth_factor, payment_amount, \
+    payoff_stats
 
 
 class TestUtils(TestCase):
     def test_money_amount(self):
         """Test money amount string formatting"""
-        inputs = [100, 100.123, 1000, 1e6]
-        expected = ['$100.00', '$100.12', '$1,000.00', '$1,000,000.00']
+        inputs = [100, 100.123, 1000, 1e6, -100, -1000]
+        expected = ['$100.00', '$100.12', '$1,000.00', '$1,000,000.00', '$-100.00', '$-1,000.00']
 
         # Format inputs
         formatted = [money_amount(i) for i in inputs]
@@ -16,6 +18,24 @@ class TestUtils(TestCase):
         # Check
         self.assertEqual(formatted, expected)
 
+    def test_money_amounts(self):
+        """Test that an array of amounts is formatted like each amount"""
+        inputs = [100, 100.123, 1000, 1e6, -100, -1000]
+
+        self.assertEqual(money_amounts(inputs), [money_amount(i) for i in inputs])
+
+    def test_round2(self):
+        """Test that amounts are rounded to cents like rounding each NumPy float"""
+        inputs = np.array([100, 100.123, 100.126, 1e6 / 3, -2.675])
+
+        self.assertEqual(round2(inputs), [round(i, 2) for i in inputs])
+
+    def test_payment_amount(self):
+        """Payment toward a balance should be capped at the balance"""
+        self.assertEqual(payment_amount(100, 50), 50)
+        self.assertEqual(payment_amount(50, 100), 50)
+        self.assertEqual(payment_amount(50, 50), 50)
+
     def test_break_payloan(self):
         """Test that pay_loan() gives error with insufficient payment"""
         principal = 1e4
@@ -39,4 +59,86 @@ class TestUtils(TestCase):
         try:
             pay_loan(payment, principal, rate)
         except AssertionError:
-            self.fail()
\ No newline at end of file
+            self.fail()
+
+    def test_break_payloan_interest_only(self):
+        """Test that a payment covering only the interest fails, as the balance would never be paid off"""
+        principal = 1e4
+        rate = .05
+        payment = principal * (growth_factor(rate, 365, 1/12) - 1)
+
+        with self.assertRaises(AssertionError):
+            pay_loan(payment, principal, rate)
+
+    def test_payloan_matches_single_payments(self):
+        """Test that the closed form schedule matches paying one period at a time within the growth of rounding error"""
+        rng = np.random.default_rng(0)
+        for _ in range(300):
+            principal = round(rng.uniform(1e3, 5e5), 2)
+            rate = round(rng.uniform(.01, .12), 4)
+            g = growth_factor(rate, 365, 1 / 12)
+            payment = round(principal * (g - 1) * rng.uniform(1.05, 3), 2)
+
+            # Pay one period at a time
+            P = principal
+            balances = []
+            payments = []
+            while P > 0:
+                P, curr_pay = single_payment(payment, P, rate)
+                balances.append(P)
+                payments.append(curr_pay)
+
+            closed_balances, closed_payments = pay_loan(payment, principal, rate)
+
+            # Half a cent of rounding each period, grown by interest since
+            k = np.arange(1, min(len(closed_balances), len(balances)) + 1)
+            bound = .005 * (1 + (g ** k - 1) / (g - 1))
+            self.assertLessEqual(abs(len(closed_balances) - len(balances)), 1)
+            self.assertEqual(closed_balances[-1], 0)
+            self.assertTrue((np.abs(np.subtract(closed_balances[:len(k)], balances[:len(k)])) <= bound).all())
+            self.assertLessEqual(abs(sum(closed_payments) - sum(payments)), g * bound[-1])
+
+    def test_payloan_zero_rate(self):
+        """Test that a loan without interest is paid off in principal / payment payments"""
+        balances, payments = pay_loan(300, 1000, 0)
+
+        self.assertEqual(balances, [700., 400., 100., 0.])
+        self.assertEqual(payments, [300, 300, 300, 100])
+
+    def test_payloan_final_payment(self):
+        """Test that the final payment is the last balance after accruing interest"""
+        principal = 1e4
+        rate = .05
+        balances, payments = pay_loan(300, principal, rate)
+
+        self.assertEqual(payments[-1], round(balances[-2] * growth_factor(rate, 365, 1/12), 2))
+
+        # Paid off with a single payment
+        balances, payments = pay_loan(2e4, principal, rate)
+        self.assertEqual(payments, [round(principal * growth_factor(rate, 365, 1/12), 2)])
+
+    def test_payoff_stats(self):
+        """Test that the number of payments and totals match paying off with each amount"""
+        # 30 year mortgage at 6% per year, compounding monthly
+        payments = [1199.11, 1199.10, 2000]
+        sufficient, totals, n_payments = payoff_stats(payments, 2e5, .06 / 12, n=1, t=1)
+
+        self.assertTrue(sufficient.all())
+        self.assertEqual(n_payments[0], 360)
+        for payment, total, k in zip(payments, totals, n_payments):
+            balances, schedule = pay_loan(payment, 2e5, .06 / 12, n=1, t=1)
+            self.assertEqual(k, len(schedule))
+            self.assertAlmostEqual(total, sum(schedule), places=6)
+
+    def test_payoff_stats_edges(self):
+        """Test that insufficient amounts are masked out and a single payment pays off the loan with interest"""
+        principal = 1e4
+        rate = .05
+        sufficient, totals, n_payments = payoff_stats([10, 50, 1e5], principal, rate)
+
+        self.assertEqual(list(sufficient), [False, True, True])
+        # Only sufficient amounts are reported
+        schedule = pay_loan(50, principal, rate)[1]
+        self.assertEqual(list(n_payments), [len(schedule), 1])
+        self.assertAlmostEqual(totals[0], sum(schedule), places=6)
+        self.assertEqual(totals[1], round(principal * growth_factor(rate, 365, 1/12), 2))